@@ -0,0 +1,273 @@
+# area_cube.py
+# Precomputed per-area aggregates for the dashboard.
+#
+# update_all used to copy and filter the whole detail table on every dropdown
+# change. The cube below is built once per dataset (and persisted next to the
+# data), so the callback only has to look up an entry and assemble figures.
+import os
+import pickle
+import calendar
+
+import numpy as np
+import pandas as pd
+
+CUBE_VERSION = 1
+
+DAY_NAMES = [calendar.day_name[i] for i in range(0, 7)]
+
+# fixed 5-year bins so entries of different builds can be added together
+AGE_EDGES = np.arange(0, 125, 5)
+
+PREMIS_CANDIDATES = ['premis', 'premis_desc', 'location', 'premise']
+
+
+# =========================
+# Helpers
+# =========================
+def _mode_label(counts):
+    """Same pick as Series.mode()[0]: highest count, smallest label on ties."""
+    if counts is None or counts.empty:
+        return "-"
+    top = counts[counts == counts.max()]
+    return sorted(top.index)[0]
+
+
+def _counts_by_area(df, col, area_index):
+    """Full value counts of `col` for every area, as {area: Series desc}."""
+    out = {a: pd.Series(dtype='int64') for a in area_index}
+    if col not in df.columns:
+        return out
+    sub = df[['area_name', col]].dropna()
+    if sub.empty:
+        return out
+    grp = sub.groupby(['area_name', col], observed=True, sort=False).size()
+    for area, counts in grp.groupby(level=0, observed=True, sort=False):
+        counts = counts.droplevel(0)
+        out[area] = counts[counts > 0].sort_values(ascending=False)
+    return out
+
+
+def _entry_from_parts(total, day_hour, crm_counts, premis_counts, premis_col,
+                      age_hist, age_sum, age_n, age_bin_counts):
+    day_hour = np.asarray(day_hour, dtype='int64')
+    if day_hour.sum() > 0:
+        peak_day = DAY_NAMES[int(day_hour.sum(axis=1).argmax())]
+        peak_hour = int(day_hour.sum(axis=0).argmax())
+    else:
+        peak_day, peak_hour = "-", "-"
+    avg_age = (age_sum / age_n) if age_n else np.nan
+    return {
+        'total': int(total),
+        'day_hour': day_hour,
+        'crm_counts': crm_counts,
+        'premis_counts': premis_counts,
+        'premis_col': premis_col,
+        'age_hist': np.asarray(age_hist, dtype='int64'),
+        'age_sum': float(age_sum),
+        'age_n': int(age_n),
+        'age_bin_counts': age_bin_counts,
+        'top_crime': _mode_label(crm_counts),
+        'peak_day': peak_day,
+        'peak_hour': peak_hour,
+        'avg_age': avg_age,
+    }
+
+
+# =========================
+# Build
+# =========================
+def build_area_cube(df):
+    """Aggregate df_detail into {'areas': {area: entry}, 'all': entry}."""
+    cube = {'version': CUBE_VERSION, 'areas': {}, 'all': None}
+    if df.empty or 'area_name' not in df.columns:
+        return cube
+
+    area_cat = pd.Categorical(df['area_name'])
+    areas = list(area_cat.categories)
+    n_areas = len(areas)
+    codes = area_cat.codes.astype('int64')
+    valid = codes >= 0
+
+    # day x hour counts for every area in one bincount
+    day_hour = np.zeros((n_areas, 7, 24), dtype='int64')
+    if 'day_of_week' in df.columns and 'hour_occ' in df.columns:
+        dow = pd.to_numeric(df['day_of_week'], errors='coerce').to_numpy()
+        hour = pd.to_numeric(df['hour_occ'], errors='coerce').to_numpy()
+        ok = valid & ~np.isnan(dow) & ~np.isnan(hour)
+        flat = codes[ok] * 168 + dow[ok].astype('int64') * 24 + hour[ok].astype('int64')
+        day_hour = np.bincount(flat, minlength=n_areas * 168).reshape(n_areas, 7, 24)
+
+    # victim age histogram, sum and count per area
+    age_hist = np.zeros((n_areas, len(AGE_EDGES) - 1), dtype='int64')
+    age_sum = np.zeros(n_areas)
+    age_n = np.zeros(n_areas, dtype='int64')
+    if 'vict_age' in df.columns:
+        age = pd.to_numeric(df['vict_age'], errors='coerce').to_numpy(dtype='float64')
+        ok = valid & ~np.isnan(age)
+        age_sum = np.bincount(codes[ok], weights=age[ok], minlength=n_areas)
+        age_n = np.bincount(codes[ok], minlength=n_areas)
+        bins = np.clip(np.digitize(age[ok], AGE_EDGES) - 1, 0, len(AGE_EDGES) - 2)
+        age_hist = np.bincount(codes[ok] * (len(AGE_EDGES) - 1) + bins,
+                               minlength=n_areas * (len(AGE_EDGES) - 1)).reshape(n_areas, -1)
+
+    totals = np.bincount(codes[valid], minlength=n_areas)
+
+    premis_col = next((c for c in PREMIS_CANDIDATES if c in df.columns), None)
+    crm_counts = _counts_by_area(df, 'crm', areas)
+    premis_counts = _counts_by_area(df, premis_col, areas) if premis_col else {a: pd.Series(dtype='int64') for a in areas}
+    age_bin_counts = _counts_by_area(df, 'vict_age_bin', areas)
+
+    for i, area in enumerate(areas):
+        cube['areas'][area] = _entry_from_parts(
+            totals[i], day_hour[i], crm_counts[area], premis_counts[area], premis_col,
+            age_hist[i], age_sum[i], age_n[i], age_bin_counts[area])
+
+    cube['all'] = merge_entries(list(cube['areas'].values()))
+    # rows without an area still count towards the national total
+    cube['all']['total'] = int(len(df))
+    return cube
+
+
+def merge_entries(entries, weights=None):
+    """Add several cube entries together (counts are additive).
+
+    `weights` (+1/-1 per entry) lets an increment remove old record versions.
+    """
+    if weights is None:
+        weights = [1] * len(entries)
+    pairs = [(e, w) for e, w in zip(entries, weights) if e is not None]
+    if not pairs:
+        return None
+
+    def add_counts(key):
+        parts = [e[key] * w for e, w in pairs if e[key] is not None and not e[key].empty]
+        if not parts:
+            return pd.Series(dtype='int64')
+        counts = pd.concat(parts).groupby(level=0, sort=False, observed=True).sum()
+        return counts[counts > 0].sort_values(ascending=False)
+
+    return _entry_from_parts(
+        sum(e['total'] * w for e, w in pairs),
+        sum(e['day_hour'] * w for e, w in pairs),
+        add_counts('crm_counts'),
+        add_counts('premis_counts'),
+        next((e['premis_col'] for e, _ in pairs if e['premis_col']), None),
+        sum(e['age_hist'] * w for e, w in pairs),
+        sum(e['age_sum'] * w for e, w in pairs),
+        sum(e['age_n'] * w for e, w in pairs),
+        add_counts('age_bin_counts'),
+    )
+
+
+def apply_delta(cube, added, removed=None):
+    """cube + added - removed, area by area (all three from build_area_cube)."""
+    removed = removed or {'areas': {}, 'all': None}
+    out = {'version': CUBE_VERSION, 'areas': {}, 'all': None}
+    for area in set(cube['areas']) | set(added['areas']):
+        entry = merge_entries([cube['areas'].get(area), added['areas'].get(area), removed['areas'].get(area)],
+                              weights=[1, 1, -1])
+        if entry is not None and entry['total'] > 0:
+            out['areas'][area] = entry
+    out['areas'] = dict(sorted(out['areas'].items()))
+    out['all'] = merge_entries([cube['all'], added['all'], removed['all']], weights=[1, 1, -1])
+    return out
+
+
+# =========================
+# Persist
+# =========================
+def source_signature(paths):
+    """(path, size, mtime) of every existing source file; changes invalidate the cube."""
+    sig = []
+    for p in paths:
+        if p and os.path.exists(p):
+            st = os.stat(p)
+            sig.append((os.path.abspath(p), st.st_size, int(st.st_mtime)))
+    return tuple(sig)
+
+
+def save_area_cube(cube, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(cube, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_area_cube(path, signature=None):
+    """Return the persisted cube, or None if missing/stale."""
+    try:
+        with open(path, 'rb') as f:
+            cube = pickle.load(f)
+    except Exception:
+        return None
+    if cube.get('version') != CUBE_VERSION:
+        return None
+    if signature is not None and cube.get('signature') != signature:
+        return None
+    return cube
+
+
+def load_or_build_area_cube(df, path, source_paths=()):
+    signature = source_signature(source_paths)
+    cube = load_area_cube(path, signature) if signature else None
+    if cube is not None:
+        print(f"✅ Loaded area cube {path} ({len(cube['areas'])} areas)")
+        return cube
+    cube = build_area_cube(df)
+    cube['signature'] = signature
+    if signature:
+        try:
+            save_area_cube(cube, path)
+            print(f"✅ Saved area cube {path} ({len(cube['areas'])} areas)")
+        except Exception as e:
+            print(f"❌ Fail save area cube {path}: {e}")
+    return cube
+
+
+# =========================
+# Entry for an arbitrary row subset (filtered views)
+# =========================
+def _counts_for_rows(s, rows):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()[rows]
+        counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(s.cat.categories)),
+                           index=s.cat.categories)
+    else:
+        counts = s.iloc[rows].value_counts()
+    return counts[counts > 0].sort_values(ascending=False)
+
+
+def _numeric_rows(s, rows):
+    """float64 values of s at `rows`; only the selected values are converted."""
+    return pd.to_numeric(s.iloc[rows], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def build_entry(df, rows):
+    """Cube entry for the rows at positions `rows` of df (bincounts only, no copy of df)."""
+    rows = np.asarray(rows, dtype='int64')
+    day_hour = np.zeros((7, 24), dtype='int64')
+    if 'day_of_week' in df.columns and 'hour_occ' in df.columns:
+        dow = _numeric_rows(df['day_of_week'], rows)
+        hour = _numeric_rows(df['hour_occ'], rows)
+        ok = ~np.isnan(dow) & ~np.isnan(hour)
+        day_hour = np.bincount(dow[ok].astype('int64') * 24 + hour[ok].astype('int64'),
+                               minlength=168).reshape(7, 24)
+
+    age_hist = np.zeros(len(AGE_EDGES) - 1, dtype='int64')
+    age_sum, age_n = 0.0, 0
+    if 'vict_age' in df.columns:
+        age = _numeric_rows(df['vict_age'], rows)
+        age = age[~np.isnan(age)]
+        age_sum, age_n = age.sum(), len(age)
+        bins = np.clip(np.digitize(age, AGE_EDGES) - 1, 0, len(AGE_EDGES) - 2)
+        age_hist = np.bincount(bins, minlength=len(AGE_EDGES) - 1)
+
+    empty = pd.Series(dtype='int64')
+    premis_col = next((c for c in PREMIS_CANDIDATES if c in df.columns), None)
+    return _entry_from_parts(
+        len(rows), day_hour,
+        _counts_for_rows(df['crm'], rows) if 'crm' in df.columns else empty,
+        _counts_for_rows(df[premis_col], rows) if premis_col else empty,
+        premis_col, age_hist, age_sum, age_n,
+        _counts_for_rows(df['vict_age_bin'], rows) if 'vict_age_bin' in df.columns else empty)
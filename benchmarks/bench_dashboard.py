@@ -0,0 +1,278 @@
+# bench_dashboard.py
+# Reproducible end-to-end benchmark of the dashboard on synthetic data shaped
+# like Crime_Data_with_Binning.csv.
+#
+# For every size a data dir is written (seeded, so the same rows every run)
+# and the dashboard is imported in fresh worker processes:
+#
+#   cold   empty cache dir: CSV parse, prepare_detail, cube/rollup/pyramid builds
+#   warm   the same data dir again, read back from the Parquet/pickle caches
+#
+# The cold worker also times each normalization helper on the raw CSV and
+# each update_all branch (builders called directly, so the figure cache is
+# bypassed), once per area and once with extra filters. Peak RSS and the JSON
+# payload size sent to the browser are recorded per branch. Results go to a
+# JSON file that can be diffed between releases with --compare.
+#
+#   python benchmarks/bench_dashboard.py --rows 10000 100000 1000000 5000000 --out bench-v1.json
+#   python benchmarks/bench_dashboard.py --compare bench-v1.json bench-v2.json
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from synthetic import write_dashboard_data
+
+BENCH_VERSION = 1
+BRANCHES = ['insight', 'police_vs', 'heatmap', 'map', 'crime', 'premis', 'age', 'trend', 'table']
+HELPERS = ['read_csv', 'normalize_cols', 'ensure_area_name', 'try_parse_dates', 'prepare_detail']
+# --compare flags metrics that grew by more than this share (all are lower-is-better)
+COMPARE_TOLERANCE = 0.10
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return time.perf_counter() - t0, out
+
+
+def summarize(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {'median_ms': float(np.median(ms)), 'p95_ms': float(np.percentile(ms, 95)),
+            'max_ms': float(ms.max()), 'n': int(len(ms))}
+
+
+# =========================
+# Worker (one dashboard import per process)
+# =========================
+def payload_bytes(out):
+    """Size of the JSON the callback would send for `out`."""
+    from plotly.io.json import to_json_plotly
+    if hasattr(out, 'to_plotly_json'):
+        out = out.to_plotly_json()
+    return len(to_json_plotly(out))
+
+
+def bench_helpers(detail_path, repeat):
+    import pandas as pd
+    from preprocess import normalize_cols, ensure_area_name, try_parse_dates, prepare_detail
+
+    times = {h: [] for h in HELPERS}
+    for _ in range(repeat):
+        t, raw = timed(pd.read_csv, detail_path)
+        times['read_csv'].append(t)
+        t, df = timed(normalize_cols, raw)
+        times['normalize_cols'].append(t)
+        t, df = timed(ensure_area_name, df)
+        times['ensure_area_name'].append(t)
+        t, _ = timed(try_parse_dates, df, ['date_time_occ', 'date_rptd', 'date_rptd_time', 'date_occ'])
+        times['try_parse_dates'].append(t)
+        t, _ = timed(prepare_detail, raw, report=False)
+        times['prepare_detail'].append(t)
+    return {h: summarize(v) for h, v in times.items()}
+
+
+def bench_branches(db, keys, repeat):
+    """{branch: timing summary + payload size} over `keys` (filter_key tuples)."""
+    from schema import to_display
+
+    def table(key):
+        selected = db.run_query(db.table_index, db.select_rows(db.filter_idx, key), '',
+                                [{'column_id': 'date_time_occ', 'direction': 'desc'}], cache_key=key)
+        page, _ = db.page_rows(selected, 0, db.TABLE_PAGE_SIZE)
+        return to_display(db.df_detail.iloc[page][db.table_cols]).to_dict('records')
+
+    def render_map(key):
+        levels = db.map_levels(key)
+        return db.render_map(key, levels, db.total_points(levels))
+
+    def trend(key):
+        crm = dict(key[4]).get('crm')
+        return db.build_trend_fig(key[0], key[1], key[2], crm, 'auto')
+
+    builders = {**db.AREA_BUILDERS, 'map': render_map, 'trend': trend, 'table': table}
+    results = {}
+    for branch in BRANCHES:
+        times, sizes = [], []
+        for key in keys:
+            for _ in range(repeat):
+                # measure the computation, not the caches in front of it
+                db.filtered_entries.clear()
+                db.filtered_map_levels.clear()
+                db.table_index['results'].clear()
+                t, out = timed(builders[branch], key)
+                times.append(t)
+            sizes.append(payload_bytes(out))
+        results[branch] = {**summarize(times), 'payload_bytes': int(np.median(sizes)),
+                           'payload_max_bytes': int(max(sizes))}
+    return results
+
+
+def worker(data_dir, cache_dir, phase, repeat, n_areas, out_path):
+    os.environ.update({'CRIME_DATA_DIR': data_dir, 'CRIME_CACHE_DIR': cache_dir,
+                       'CRIME_STORE_DIR': os.path.join(data_dir, 'no-store'), 'FIGURE_CACHE_PREWARM': '0'})
+    from stream_clean import peak_rss_mb
+
+    t_import, db = timed(__import__, 'dashboard')
+    result = {'phase': phase, 'start_s': t_import, 'rows': int(len(db.df_detail)),
+              'rss_after_start_mb': peak_rss_mb()}
+    if phase == 'cold':
+        areas = db.areas[:n_areas]
+        lo, hi = db.date_min, db.date_max
+        mid = (lo + (hi - lo) / 2) if lo is not None and hi is not None else None
+        filtered = [db.current_filters(a, str(lo.date()) if mid is not None else None,
+                                       str(mid.date()) if mid is not None else None,
+                                       [8, 20], None, ['F'], None, None, None) for a in areas]
+        result['branches'] = {'area': bench_branches(db, [db.filter_key(a) for a in areas], repeat),
+                              'all_areas': bench_branches(db, [db.filter_key(None)], repeat),
+                              'filtered': bench_branches(db, filtered, repeat)}
+        result['helpers'] = bench_helpers(db.detail_path, repeat)
+    result['peak_rss_mb'] = peak_rss_mb()
+    with open(out_path, 'w') as f:
+        json.dump(result, f)
+
+
+# =========================
+# Driver
+# =========================
+def run_worker(data_dir, cache_dir, phase, args):
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+        out_path = tmp.name
+    try:
+        cmd = [sys.executable, os.path.abspath(__file__), '--worker', data_dir, '--cache-dir', cache_dir,
+               '--phase', phase, '--repeat', str(args.repeat), '--areas', str(args.areas), '--out', out_path]
+        subprocess.run(cmd, check=True, cwd=ROOT, stdout=subprocess.DEVNULL if not args.verbose else None)
+        with open(out_path) as f:
+            return json.load(f)
+    finally:
+        os.remove(out_path)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def environment():
+    import pandas as pd
+    import plotly
+    import dash
+    return {'bench_version': BENCH_VERSION, 'commit': git_commit(), 'python': platform.python_version(),
+            'pandas': pd.__version__, 'numpy': np.__version__, 'plotly': plotly.__version__,
+            'dash': dash.__version__, 'platform': platform.platform(), 'cores': os.cpu_count(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def run(args):
+    results = []
+    for n in args.rows:
+        with tempfile.TemporaryDirectory(prefix='bench-dashboard-') as tmp:
+            data_dir = os.path.join(tmp, 'data')
+            cache_dir = os.path.join(tmp, 'cache')
+            t_gen, _ = timed(write_dashboard_data, data_dir, n, args.seed)
+            print(f"✅ {n} rows written in {t_gen:.1f} s")
+            cold = run_worker(data_dir, cache_dir, 'cold', args)
+            warm = run_worker(data_dir, cache_dir, 'warm', args)
+            results.append({'rows': n, 'seed': args.seed,
+                            'csv_bytes': os.path.getsize(os.path.join(data_dir, 'Crime_Data_with_Binning.csv')),
+                            'cold_start_s': cold['start_s'], 'warm_start_s': warm['start_s'],
+                            'peak_rss_mb': cold['peak_rss_mb'], 'start_rss_mb': cold['rss_after_start_mb'],
+                            'warm_start_rss_mb': warm['rss_after_start_mb'],
+                            'helpers': cold['helpers'], 'branches': cold['branches']})
+            print_size(results[-1])
+    return results
+
+
+def print_size(r):
+    print(f"\n{r['rows']} rows: cold start {r['cold_start_s']:.2f} s, warm start {r['warm_start_s']:.2f} s, "
+          f"peak RSS {r['peak_rss_mb'] or 0:.0f} MB")
+    print(f"{'helper':>18} {'median ms':>10}")
+    for h, s in r['helpers'].items():
+        print(f"{h:>18} {s['median_ms']:>10.1f}")
+    print(f"{'branch':>10} {'scope':>10} {'median ms':>10} {'p95 ms':>9} {'payload KB':>11}")
+    for scope, branches in r['branches'].items():
+        for b, s in branches.items():
+            print(f"{b:>10} {scope:>10} {s['median_ms']:>10.1f} {s['p95_ms']:>9.1f} {s['payload_bytes'] / 1024:>11.1f}")
+
+
+# =========================
+# Compare two result files
+# =========================
+def flatten(result):
+    """{(rows, metric path): value} for the numbers worth diffing."""
+    out = {}
+    for r in result['results']:
+        n = r['rows']
+        for m in ['cold_start_s', 'warm_start_s', 'peak_rss_mb']:
+            if r.get(m) is not None:
+                out[(n, m)] = r[m]
+        for h, s in r['helpers'].items():
+            out[(n, f'helper.{h}.median_ms')] = s['median_ms']
+        for scope, branches in r['branches'].items():
+            for b, s in branches.items():
+                out[(n, f'{scope}.{b}.median_ms')] = s['median_ms']
+                out[(n, f'{scope}.{b}.payload_bytes')] = s['payload_bytes']
+    return out
+
+
+def compare(old_path, new_path, tolerance=COMPARE_TOLERANCE):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    a, b = flatten(old), flatten(new)
+    print(f"old: {old['meta'].get('commit')}  new: {new['meta'].get('commit')}")
+    print(f"{'rows':>9} {'metric':<36} {'old':>11} {'new':>11} {'ratio':>7}")
+    regressions = 0
+    for k in sorted(set(a) & set(b)):
+        ratio = b[k] / a[k] if a[k] else float('nan')
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag, regressions = ' ❌', regressions + 1
+        elif ratio < 1 - tolerance:
+            flag = ' ✅'
+        print(f"{k[0]:>9} {k[1]:<36} {a[k]:>11.2f} {b[k]:>11.2f} {ratio:>7.2f}{flag}")
+    print(f"\n{regressions} metric(s) worse by more than {tolerance:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard load/callback benchmark on synthetic data.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 5_000_000])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per branch and key")
+    parser.add_argument('--areas', type=int, default=3, help="areas timed per branch")
+    parser.add_argument('--out', default=None, help="write the results to this JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="diff two result files")
+    parser.add_argument('--verbose', action='store_true', help="show the dashboard's own output")
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--phase', default='cold', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    if args.worker:
+        worker(args.worker, args.cache_dir, args.phase, args.repeat, args.areas, args.out)
+        return
+
+    results = run(args)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'meta': environment(), 'results': results}, f, indent=2, sort_keys=True)
+        print(f"✅ Results written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# bench_districts.py
+# District assignment: per-row shapely lambda + gpd.sjoin (00_prototype.ipynb)
+# vs. districts.assign_districts (bbox index + contains_xy, vectorized chunks).
+#
+#   python benchmarks/bench_districts.py --rows 100000 200000
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from districts import assign_districts, load_districts, DEFAULT_GEOJSON
+
+
+def synthetic_coords(n, seed=42):
+    """LA-bbox coordinates with ~1% (0, 0) rows, like the LAPD extract."""
+    rng = np.random.default_rng(seed)
+    _, _, _, (xmin, ymin, xmax, ymax) = load_districts(DEFAULT_GEOJSON)
+    df = pd.DataFrame({'LAT': rng.uniform(ymin, ymax, n), 'LON': rng.uniform(xmin, xmax, n)})
+    zero = rng.random(n) < 0.01
+    df.loc[zero, ['LAT', 'LON']] = 0.0
+    return df
+
+
+def notebook_sjoin(df):
+    import geopandas as gpd
+    from shapely.geometry import Point
+
+    districts = gpd.read_file(DEFAULT_GEOJSON)
+    df = df.copy()
+    df['geometry'] = df.apply(lambda row: Point(row['LON'], row['LAT']), axis=1)
+    dist_gdf = gpd.GeoDataFrame(df, geometry='geometry', crs=districts.crs)
+    joined = gpd.sjoin(dist_gdf, districts[['District', 'geometry']], how='left', predicate='within')
+    joined = joined[~joined.index.duplicated(keep='first')]
+    return joined['District'].to_numpy(dtype='float64')
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--skip-sjoin', action='store_true', help="only time assign_districts")
+    args = parser.parse_args()
+
+    load_districts(DEFAULT_GEOJSON)  # geojson load/index is a one-off, not timed
+    print(f"{'rows':>10} {'sjoin_s':>10} {'vector_s':>10} {'speedup':>8} {'agree':>7}")
+    for n in args.rows:
+        df = synthetic_coords(n)
+        t_new, new = timed(assign_districts, df['LAT'].to_numpy(), df['LON'].to_numpy())
+        t_old, agree = float('nan'), float('nan')
+        if not args.skip_sjoin:
+            try:
+                t_old, old = timed(notebook_sjoin, df)
+                agree = np.mean((old == new) | (np.isnan(old) & np.isnan(new)))
+            except ImportError:
+                print("geopandas not installed, skipping sjoin baseline")
+                args.skip_sjoin = True
+        print(f"{n:>10} {t_old:>10.3f} {t_new:>10.3f} {t_old / t_new:>8.1f} {agree:>7.4f}")
+
+
+if __name__ == '__main__':
+    main()
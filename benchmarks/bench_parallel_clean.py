@@ -0,0 +1,76 @@
+# bench_parallel_clean.py
+# Scaling of parallel_clean.clean_file_parallel with the number of worker
+# processes, against the single-process stream_clean.clean_file. Every run's
+# output is hashed to check it is identical to the serial one.
+#
+#   python benchmarks/bench_parallel_clean.py --rows 2000000 --workers 1 2 4 8 16 32
+#   python benchmarks/bench_parallel_clean.py --raw Crime_Data_from_2020_to_Present_20251006.csv
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stream_clean import clean_file
+from parallel_clean import clean_file_parallel
+from synthetic import synthetic_raw
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def timed(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - t0
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Parallel cleaning scaling benchmark.")
+    parser.add_argument('--raw', default=None, help="raw extract to clean (default: synthetic)")
+    parser.add_argument('--rows', type=int, default=500_000, help="synthetic rows when --raw is not given")
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, 8, 16, 32, cores} & set(range(1, cores + 1))))
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--json', default=None, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench-parallel-') as tmp:
+        raw = args.raw
+        if raw is None:
+            raw = os.path.join(tmp, 'raw.csv')
+            synthetic_raw(args.rows).to_csv(raw, index=False)
+
+        serial_out = os.path.join(tmp, 'serial.csv')
+        t_serial = timed(clean_file, raw, serial_out, args.chunksize)
+        reference = file_sha1(serial_out)
+
+        results = [{'mode': 'serial', 'workers': 1, 'seconds': t_serial, 'speedup': 1.0,
+                    'efficiency': 1.0, 'identical': True}]
+        for w in args.workers:
+            out = os.path.join(tmp, f'parallel-{w}.csv')
+            t = timed(clean_file_parallel, raw, out, w, args.chunksize)
+            results.append({'mode': 'parallel', 'workers': w, 'seconds': t, 'speedup': t_serial / t,
+                            'efficiency': t_serial / t / w, 'identical': file_sha1(out) == reference})
+            os.remove(out)
+
+    print(f"\n{'mode':>9} {'workers':>8} {'seconds':>9} {'speedup':>8} {'effic.':>7} {'identical':>10}  (cores: {cores})")
+    for r in results:
+        print(f"{r['mode']:>9} {r['workers']:>8} {r['seconds']:>9.2f} {r['speedup']:>8.2f} "
+              f"{r['efficiency']:>7.2f} {str(r['identical']):>10}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'cores': cores, 'raw': args.raw or f'synthetic:{args.rows}', 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# synthetic.py
+# Synthetic data shaped like the LAPD extract, for the benchmarks.
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from districts import load_districts, DEFAULT_GEOJSON
+
+AREAS = ['77th Street', 'Central', 'Devonshire', 'Foothill', 'Harbor', 'Hollenbeck', 'Hollywood',
+         'Mission', 'N Hollywood', 'Newton', 'Northeast', 'Olympic', 'Pacific', 'Rampart',
+         'Southeast', 'Southwest', 'Topanga', 'Van Nuys', 'West LA', 'West Valley', 'Wilshire']
+CRIMES = [f'CRIME {i}' for i in range(140)]
+PREMISES = [f'PREMIS {i}' for i in range(300)]
+
+
+def _skewed(rng, values, n, a=1.2):
+    """Zipf-like pick, so a few crime types/premises dominate like in the real data."""
+    p = 1.0 / np.arange(1, len(values) + 1) ** a
+    return rng.choice(values, n, p=p / p.sum())
+
+
+def synthetic_raw(n, seed=42):
+    """Frame with the columns of Crime_Data_from_2020_to_Present_*.csv."""
+    rng = np.random.default_rng(seed)
+    _, _, _, (xmin, ymin, xmax, ymax) = load_districts(DEFAULT_GEOJSON)
+    day = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365, n), unit='D')
+    premis_desc = _skewed(rng, PREMISES, n).astype(object)
+    premis_desc[rng.random(n) < 0.01] = None
+    df = pd.DataFrame({
+        'DR_NO': np.arange(200_000_000, 200_000_000 + n),
+        'Date Rptd': (day + pd.to_timedelta(rng.integers(0, 30, n), unit='D')).strftime('%m/%d/%Y 12:00:00 AM'),
+        'DATE OCC': day.strftime('%m/%d/%Y 12:00:00 AM'),
+        'TIME OCC': rng.integers(0, 24, n) * 100 + rng.integers(0, 60, n),
+        'AREA': rng.integers(1, 22, n),
+        'AREA NAME': rng.choice(AREAS, n),
+        'Rpt Dist No': rng.integers(100, 2200, n),
+        'Part 1-2': rng.integers(1, 3, n),
+        'Crm Cd': rng.integers(100, 999, n),
+        'Crm Cd Desc': _skewed(rng, CRIMES, n),
+        'Mocodes': '0344 1822',
+        'Vict Age': np.where(rng.random(n) < 0.002, 120, rng.integers(0, 100, n)),
+        'Vict Sex': rng.choice(['M', 'F', 'X', '-', None], n, p=[.4, .4, .1, .02, .08]),
+        'Vict Descent': rng.choice(['H', 'W', 'B', 'O', 'X', '-', None], n, p=[.3, .2, .15, .1, .15, .02, .08]),
+        'Premis Cd': rng.integers(100, 999, n).astype(float),
+        'Premis Desc': premis_desc,
+        'Weapon Used Cd': np.where(rng.random(n) < 0.6, np.nan, 400.0),
+        'Weapon Desc': np.where(rng.random(n) < 0.6, None, 'STRONG-ARM (HANDS, FIST, FEET OR BODILY FORCE)'),
+        'Status': 'IC',
+        'Status Desc': rng.choice(['Invest Cont', 'Adult Arrest', 'Adult Other', 'Juv Arrest'], n, p=[.8, .1, .08, .02]),
+        'Crm Cd 1': rng.integers(100, 999, n),
+        'Crm Cd 2': np.nan, 'Crm Cd 3': np.nan, 'Crm Cd 4': np.nan,
+        'LOCATION': [f'{i} MAIN ST' for i in rng.integers(1, 5000, n)],
+        'Cross Street': rng.choice([None, '1ST ST', 'BROADWAY'], n, p=[.85, .1, .05]),
+        'LAT': rng.uniform(ymin, ymax, n).round(4),
+        'LON': rng.uniform(xmin, xmax, n).round(4),
+    })
+    df.loc[rng.random(n) < 0.01, ['LAT', 'LON']] = 0.0
+    # some premis codes lose their description (dropped by cleaning), others are imputed
+    df.loc[df['Premis Desc'].isna() & (rng.random(n) < 0.5), 'Premis Cd'] = np.nan
+    return df
+
+
+def synthetic_detail(n, seed=42):
+    """Frame with the columns of Crime_Data_with_Binning.csv (the dashboard's detail file)."""
+    rng = np.random.default_rng(seed)
+    _, _, _, (xmin, ymin, xmax, ymax) = load_districts(DEFAULT_GEOJSON)
+    occ = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 5 * 365 * 24 * 60, n), unit='m')
+    age = np.where(rng.random(n) < 0.002, 120, rng.integers(0, 100, n))
+    df = pd.DataFrame({
+        'date_rptd': (occ.normalize() + pd.to_timedelta(rng.integers(0, 30, n), unit='D')).strftime('%Y-%m-%d'),
+        'area_name': rng.choice(AREAS, n),
+        'rpt_dist_no': rng.integers(100, 2200, n),
+        'part_1-2': rng.integers(1, 3, n),
+        'crm': _skewed(rng, CRIMES, n),
+        'vict_age': age,
+        'vict_sex': rng.choice(['M', 'F', 'X'], n, p=[.45, .45, .1]),
+        'vict_descent': rng.choice(['H', 'W', 'B', 'O', 'X', 'A'], n, p=[.35, .2, .15, .1, .15, .05]),
+        'premis': _skewed(rng, PREMISES, n),
+        'weapon': rng.choice(['UNKNOWN WEAPON/OTHER WEAPON', 'STRONG-ARM (HANDS, FIST, FEET OR BODILY FORCE)'], n),
+        'status': rng.choice(['Invest Cont', 'Adult Arrest', 'Adult Other', 'Juv Arrest'], n, p=[.8, .1, .08, .02]),
+        'location': [f'{i} MAIN ST' for i in rng.integers(1, 5000, n)],
+        'cross_street': rng.choice(['', '1ST ST', 'BROADWAY'], n, p=[.85, .1, .05]),
+        'lat': rng.uniform(ymin, ymax, n).round(4),
+        'lon': rng.uniform(xmin, xmax, n).round(4),
+        'district': rng.integers(1, 16, n),
+        'date_time_occ': occ.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    df.loc[rng.random(n) < 0.01, ['lat', 'lon']] = 0.0
+    df['vict_age_bin'] = pd.qcut(df['vict_age'], q=4, labels=['Muda', 'Dewasa', 'Paruh Baya', 'Tua'])
+    return df
+
+
+def write_dashboard_data(data_dir, n, seed=42):
+    """Detail CSV plus the repo's police files in `data_dir`, as the dashboard expects."""
+    processed = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'processed')
+    os.makedirs(data_dir, exist_ok=True)
+    synthetic_detail(n, seed).to_csv(os.path.join(data_dir, 'Crime_Data_with_Binning.csv'), index=False)
+    for name in ['Police_Crime.csv', 'Police_Counts_by_Area.csv']:
+        pd.read_csv(os.path.join(processed, name)).to_csv(os.path.join(data_dir, name), index=False)
+    return data_dir
@@ -0,0 +1,108 @@
+# cleaning.py
+# Cleaning steps of 00_prototype.ipynb as reusable functions.
+#
+# Input is the raw LAPD extract (Crime_Data_from_2020_to_Present_*.csv),
+# output has the column contract of Crime_Data_Clean.csv /
+# Crime_Data_with_Binning.csv that the dashboard and 01_final.ipynb read
+# (plus `dr_no`, kept as the record key).
+import numpy as np
+import pandas as pd
+
+from districts import assign_districts, DEFAULT_GEOJSON
+from imputation import impute_grouped
+
+RAW_DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+
+DROP_COLS = ['AREA', 'Crm Cd', 'Mocodes', 'Premis Cd',
+             'Weapon Used Cd', 'Status', 'Crm Cd 1', 'Crm Cd 2',
+             'Crm Cd 3', 'Crm Cd 4']
+
+RENAME_COLS = {
+    'Crm Cd Desc': 'Crm',
+    'Premis Desc': 'Premis',
+    'Weapon Desc': 'Weapon',
+    'Status Desc': 'Status',
+}
+
+AGE_BIN_LABELS = ['Muda', 'Dewasa', 'Paruh Baya', 'Tua']
+
+
+# =========================
+# Steps (raw column names)
+# =========================
+def parse_raw_dates(s):
+    out = pd.to_datetime(s, format=RAW_DATE_FORMAT, errors='coerce')
+    if out.isna().all() and s.notna().any():
+        out = pd.to_datetime(s, errors='coerce')
+    return out
+
+
+def merge_date_time(df):
+    """DATE OCC + TIME OCC (hhmm) -> DATE_TIME_OCC."""
+    df = df.copy()
+    date = parse_raw_dates(df['DATE OCC'])
+    hhmm = pd.to_numeric(df['TIME OCC'], errors='coerce')
+    df['DATE_TIME_OCC'] = date.dt.normalize() + pd.to_timedelta(hhmm // 100, unit='h') \
+        + pd.to_timedelta(hhmm % 100, unit='m')
+    return df.drop(columns=['DATE OCC', 'TIME OCC'], errors='ignore')
+
+
+def add_district(df, geojson=DEFAULT_GEOJSON):
+    """DISTRICT from LAT/LON; rows outside every council district are dropped."""
+    df = df.copy()
+    df['DISTRICT'] = assign_districts(df['LAT'].to_numpy(), df['LON'].to_numpy(), geojson)
+    return df.dropna(subset=['DISTRICT'])
+
+
+def fix_weapon_premis(df):
+    df = df.copy()
+    df['Weapon Desc'] = df['Weapon Desc'].fillna('UNKNOWN WEAPON/OTHER WEAPON')
+    # premis code without description cannot be recovered
+    df = df[~((df['Premis Cd'].notna()) & (df['Premis Desc'].isna()))]
+    df.loc[df['Vict Descent'] == '-', 'Vict Descent'] = 'X'
+    df.loc[df['Vict Sex'] == '-', 'Vict Sex'] = 'X'
+    return df
+
+
+def rename_normalize(df):
+    df = df.drop(columns=[c for c in DROP_COLS if c in df.columns])
+    df = df.rename(columns=RENAME_COLS)
+    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+    return df
+
+
+# =========================
+# Age bins (global quartiles)
+# =========================
+def age_bin_edges(vict_age):
+    """Quartile edges of vict_age, same cut points as pd.qcut(q=4)."""
+    return list(pd.Series(vict_age).dropna().quantile([0, 0.25, 0.5, 0.75, 1.0]).to_numpy())
+
+
+def add_age_bin(df, edges):
+    """vict_age_bin from fixed edges; the outer edges are open so later
+    extracts outside the original range still get a bin."""
+    df = df.copy()
+    bins = [-np.inf] + list(edges[1:-1]) + [np.inf]
+    df['vict_age_bin'] = pd.cut(df['vict_age'], bins=bins, labels=AGE_BIN_LABELS).astype(object)
+    return df
+
+
+# =========================
+# Full flow
+# =========================
+def clean_raw(df, age_edges=None, impute=impute_grouped):
+    """Raw extract -> clean frame. Returns (clean, age_edges).
+
+    Without `age_edges` the quartiles of this frame are used, like the
+    notebook; pass the stored edges when cleaning an increment.
+    """
+    df = merge_date_time(df)
+    df = add_district(df)
+    df = fix_weapon_premis(df)
+    df = impute(df)
+    df = rename_normalize(df)
+    if age_edges is None:
+        age_edges = age_bin_edges(df['vict_age'])
+    df = add_age_bin(df, age_edges)
+    return df, age_edges
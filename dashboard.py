@@ -1,21 +1,57 @@
 # crime_dashboard_final.py
 import os
+import hashlib
 import warnings
 warnings.filterwarnings("ignore")
 
 import pandas as pd
 import numpy as np
-import calendar
 
-from dash import Dash, dcc, html, Input, Output, dash_table
+from dash import Dash, dcc, html, Input, Output, dash_table, ctx
+from flask import request as flask_request
 import plotly.express as px
 import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
 
+from area_cube import load_or_build_area_cube, build_entry, source_signature, AGE_EDGES, DAY_NAMES
+from data_cache import load_cached_frame
+from schema import to_display
+from preprocess import prepare_agg, prepare_detail
+from map_bins import load_or_build_map_pyramid, point_cells, levels_for_rows, query_cells, viewport_from_relayout, total_points, center_of
+from figure_cache import FigureCache, prewarm
+from table_query import build_table_index, run_query, page_rows
+from filter_index import ResultCache, build_filter_index, filter_key, is_filtered, select_rows, options_for, date_bounds
+from trend_store import load_or_build_rollup, build_tiers, pick_tier, trend_with_stats
+from staffing import load_rosters, clean_rosters, yearly_counts, asof_staffing, area_summary
+from instrumentation import tracer, span, request_span, SLOW_MS
+from eda_stats import hotspot_table, TOP_AREAS
+
 # =========================
 # CONFIG & WORKDIR
 # =========================
 base_path = r"D:\crime_dashboard"
+data_dir = os.environ.get('CRIME_DATA_DIR', r'C:\Users\pc\Downloads\crime_dashboard')
+cache_dir = os.environ.get('CRIME_CACHE_DIR', os.path.join(data_dir, 'cache'))
+agg_path = os.path.join(data_dir, 'Police_Crime.csv')
+detail_path = os.path.join(data_dir, 'Crime_Data_with_Binning.csv')
+
+# partitioned store written by incremental.py (used instead of the CSVs if present)
+store_dir = os.environ.get('CRIME_STORE_DIR', os.path.join(data_dir, 'store'))
+store_manifest = os.path.join(store_dir, 'manifest.json')
+use_store = os.path.exists(store_manifest)
+
+# timing spans + per-area latency percentiles on /metrics (CRIME_TRACE=1); CRIME_PROFILE=1 also
+# samples the stacks of requests and dumps those slower than CRIME_SLOW_MS as flame-graph input
+profile_requests = os.environ.get('CRIME_PROFILE', '0') == '1'
+tracer.configure(enabled=profile_requests or os.environ.get('CRIME_TRACE', '0') == '1',
+                 profile=profile_requests, slow_ms=float(os.environ.get('CRIME_SLOW_MS', SLOW_MS)),
+                 profile_dir=os.environ.get('CRIME_PROFILE_DIR', os.path.join(cache_dir, 'profiles')))
+
+# only these detail columns are read back from the cache
+detail_columns = ['date_rptd', 'date_time_occ', 'area_name', 'rpt_dist_no', 'part_1_2', 'crm',
+                  'vict_age', 'vict_sex', 'vict_descent', 'premis', 'premis_desc', 'premise', 'status',
+                  'location', 'cross_street', 'lat', 'lon', 'latitude', 'longitude', 'district',
+                  'vict_age_bin', 'hour_occ', 'day_name', 'day_of_week', 'year_occ']
 # os.makedirs(base_path, exist_ok=True)
 # os.chdir(base_path)
 
@@ -41,134 +77,170 @@ def safe_read_csv(url):
         print(f"❌ Fail load {url}: {e}")
         return pd.DataFrame()
 
+# =========================
+# LOAD (via columnar cache in cache_dir)
+# =========================
 # df_agg = safe_read_csv('/Police_Crime.csv')
 # df_detail = safe_read_csv('/Crime_Data_with_Binning.csv')
-df_agg = pd.read_csv(r'C:\Users\pc\Downloads\crime_dashboard\Police_Crime.csv')
-df_detail = pd.read_csv(r'C:\Users\pc\Downloads\crime_dashboard\Crime_Data_with_Binning.csv')
+if use_store:
+    from incremental import read_store, store_paths
+    agg_path = store_paths(store_dir)['police_crime']
+    with span('load.agg'):
+        df_agg = load_cached_frame(agg_path, prepare_agg, cache_dir)
+    # the manifest changes with every ingested batch, so it keys the cache
+    with span('load.detail'):
+        df_detail = load_cached_frame(store_manifest, prepare_detail, cache_dir, columns=detail_columns,
+                                      read=lambda _: read_store(store_dir))
+else:
+    with span('load.agg'):
+        df_agg = load_cached_frame(agg_path, prepare_agg, cache_dir)
+    with span('load.detail'):
+        df_detail = load_cached_frame(detail_path, prepare_detail, cache_dir, columns=detail_columns)
 
 # =========================
-# NORMALIZE COLUMN NAMES
+# AREA CUBE (precomputed per-area aggregates, persisted in cache_dir)
 # =========================
-def normalize_cols(df):
-    df = df.copy()
-    df.columns = [c.strip() for c in df.columns]
-    # map original -> normalized
-    new_names = {orig: orig.strip().lower().replace(' ', '_').replace('-', '_') for orig in df.columns}
-    df = df.rename(columns=new_names)
-    return df
-
-if not df_agg.empty:
-    df_agg = normalize_cols(df_agg)
-if not df_detail.empty:
-    df_detail = normalize_cols(df_detail)
+with span('load.cube'):
+    if use_store:
+        # kept up to date by incremental.ingest()
+        area_cube = load_or_build_area_cube(df_detail, store_paths(store_dir)['cube'], source_paths=[store_manifest])
+    else:
+        area_cube = load_or_build_area_cube(df_detail, os.path.join(cache_dir, 'area_cube.pkl'),
+                                            source_paths=[detail_path])
+# row positions per area so map/table take rows instead of scanning df_detail
+area_rows = df_detail.groupby('area_name', sort=False, observed=True).indices if ('area_name' in df_detail.columns and not df_detail.empty) else {}
+# sorted-position indexes for the date/crime/victim/status/hour filters
+with span('load.filter_index'):
+    filter_idx = build_filter_index(df_detail)
 
 # =========================
-# Ensure area_name exists & clean
+# TREND ROLLUP (daily counts per area x crm, weekly/monthly tiers)
 # =========================
-def ensure_area_name(df):
-    df = df.copy()
-    if 'area_name' not in df.columns:
-        candidates = [c for c in df.columns if 'area' in c]
-        if candidates:
-            df['area_name'] = df[candidates[0]]
-        else:
-            df['area_name'] = "Unknown"
-    df['area_name'] = df['area_name'].astype(str).str.title().str.strip()
-    return df
+with span('load.trend'):
+    if use_store:
+        # kept up to date by incremental.ingest()
+        trend_rollup = load_or_build_rollup(df_detail, store_paths(store_dir)['trend'], source_paths=[store_manifest])
+    else:
+        trend_rollup = load_or_build_rollup(df_detail, os.path.join(cache_dir, 'trend_rollup.pkl'),
+                                            source_paths=[detail_path])
+    trend_tiers = build_tiers(trend_rollup)
 
-if not df_agg.empty:
-    df_agg = ensure_area_name(df_agg)
-if not df_detail.empty:
-    df_detail = ensure_area_name(df_detail)
+# =========================
+# STAFFING (yearly crimes per area joined with the nearest police roster)
+# =========================
+# one row per area/year instead of the area x roster-date cross join of Police_Crime.csv
+police_counts_path = os.path.join(data_dir, 'Police_Counts_by_Area.csv')
+with span('load.staffing'):
+    rosters = load_rosters(police_counts_path)
+    if rosters.empty and {'area_name', 'date', 'police_count'}.issubset(df_agg.columns):
+        # older setups only ship Police_Crime.csv; it still holds every roster snapshot
+        rosters = clean_rosters(df_agg[['area_name', 'date', 'police_count']])
+    df_staffing = asof_staffing(yearly_counts(trend_rollup['daily']), rosters)
+    df_summary = area_summary(df_staffing)
+# area -> {'total_crimes', 'police_count', 'crimes_per_police'}
+area_staffing = df_summary.set_index('area_name').to_dict('index')
 
 # =========================
-# PARSE DATES (robust)
+# MAP PYRAMID (server-side binned cells per zoom level, persisted in cache_dir)
 # =========================
-def try_parse_dates(df, cols):
-    df = df.copy()
-    for c in cols:
-        if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors='coerce', infer_datetime_format=True)
-    return df
-
-df_agg = try_parse_dates(df_agg, ['date'])
-df_detail = try_parse_dates(df_detail, ['date_time_occ', 'date_rptd', 'date_rptd_time', 'date_occ'])
-
-# derive useful time fields in detail
-if not df_detail.empty and 'date_time_occ' in df_detail.columns:
-    df_detail['hour_occ'] = df_detail['date_time_occ'].dt.hour
-    df_detail['day_name'] = df_detail['date_time_occ'].dt.day_name()
-    df_detail['day_of_week'] = df_detail['date_time_occ'].dt.weekday  # Mon=0
-    df_detail['year_occ'] = df_detail['date_time_occ'].dt.year
+lat_col = 'lat' if 'lat' in df_detail.columns else ('latitude' if 'latitude' in df_detail.columns else None)
+lon_col = 'lon' if 'lon' in df_detail.columns else ('longitude' if 'longitude' in df_detail.columns else None)
+with span('load.map'):
+    if lat_col and lon_col:
+        # not maintained by incremental.ingest(): rebuilt once after each new batch
+        map_pyramid = load_or_build_map_pyramid(df_detail, os.path.join(cache_dir, 'map_pyramid.pkl'),
+                                                source_paths=[store_manifest] if use_store else [detail_path],
+                                                lat_col=lat_col, lon_col=lon_col)
+    else:
+        map_pyramid = {'areas': {}, 'all': None}
+    # finest cell of every row, binned per filter combination
+    map_points = point_cells(df_detail[lat_col], df_detail[lon_col]) if (lat_col and lon_col) else None
+# below this many points the raw incidents are shown (with hover details)
+MAP_SCATTER_MAX = 200
 
 # =========================
-# Ensure lat/lon numeric
+# FIGURE CACHE (rendered outputs per area, keyed on the data version)
 # =========================
-for coord in ['lat', 'lon', 'latitude', 'longitude']:
-    if coord in df_detail.columns:
-        df_detail[coord] = pd.to_numeric(df_detail[coord], errors='coerce')
+# the frames above are only loaded at start, so new data (and a new version)
+# needs a restart; until then the cached outputs match the data in memory
+data_sources = ([store_manifest] if use_store else [detail_path]) + [agg_path, police_counts_path]
+data_version = hashlib.sha1(repr(source_signature(data_sources)).encode()).hexdigest()[:12]
+figure_cache = FigureCache(max_bytes=int(os.environ.get('FIGURE_CACHE_MB', 256)) * 1024 * 1024,
+                           version=data_version)
 
 # =========================
-# POLICE / TOTAL CRIMES in aggregated (safe)
+# INSIGHT UMUM (national, computed once at load)
 # =========================
-if not df_agg.empty:
-    police_col = None
-    for c in ['police_count', 'police', 'count', 'police_count_']:
-        if c in df_agg.columns:
-            police_col = c
-            break
-    if police_col:
-        df_agg['police_count'] = pd.to_numeric(df_agg[police_col], errors='coerce').fillna(0).astype(int)
+def build_national_cards():
+    cube_all = area_cube['all']
+    total_all = cube_all['total'] if cube_all else 0
+    top_area_cube = max(area_cube['areas'], key=lambda a: area_cube['areas'][a]['total']) if area_cube['areas'] else "-"
+
+    # --- MODIFY: take top area from aggregated df (df_summary / df_agg) used by police vs crimes chart
+    if not df_summary.empty and 'total_crimes' in df_summary.columns and df_summary['total_crimes'].sum() > 0:
+        try:
+            top_area_all = df_summary.sort_values('total_crimes', ascending=False).iloc[0]['area_name']
+        except Exception:
+            top_area_all = top_area_cube
     else:
-        df_agg['police_count'] = 0
+        top_area_all = top_area_cube
 
-    if 'total_crimes' not in df_agg.columns:
-        candidates = [c for c in df_agg.columns if 'total' in c and 'crime' in c]
-        if candidates:
-            df_agg['total_crimes'] = pd.to_numeric(df_agg[candidates[0]], errors='coerce').fillna(0).astype(int)
-        else:
-            if not df_detail.empty:
-                agg_from_detail = df_detail.groupby('area_name').size().reset_index(name='total_crimes_from_detail')
-                df_agg = pd.merge(df_agg, agg_from_detail, on='area_name', how='left')
-                if 'total_crimes_from_detail' in df_agg.columns:
-                    df_agg['total_crimes'] = df_agg['total_crimes_from_detail'].fillna(0).astype(int)
-                else:
-                    df_agg['total_crimes'] = 0
-            else:
-                df_agg['total_crimes'] = 0
-
-    if 'crimes_per_police' not in df_agg.columns:
-        # compute crimes per police (cases / police) if possible
-        df_agg['crimes_per_police'] = df_agg.apply(
-            lambda r: (r['total_crimes'] / r['police_count']) if (r.get('police_count', 0) and r['police_count'] > 0) else np.nan,
-            axis=1
-        )
+    top_crime_all = cube_all['top_crime'] if cube_all else "-"
+
+    # Build three colored cards (pastel palette)
+    card_style_common = {
+        'borderRadius': '10px',
+        'boxShadow': '0 4px 8px rgba(0,0,0,0.08)',
+        'padding': '6px'
+    }
+    card_total = dbc.Card([
+        dbc.CardBody([
+            html.H6("Total Kasus Semua Wilayah", className="fw-bold"),
+            html.H3(f"{total_all}", className="mb-0")
+        ])
+    ], style={**card_style_common, 'backgroundColor': '#A5D8FF', 'color': '#05233B'})
+
+    card_topcrime = dbc.Card([
+        dbc.CardBody([
+            html.H6("Jenis Kejahatan Terbanyak Nasional", className="fw-bold"),
+            html.H4(f"{top_crime_all}", className="mb-0")
+        ])
+    ], style={**card_style_common, 'backgroundColor': '#C3FAE8', 'color': '#053028'})
+
+    card_toparea = dbc.Card([
+        dbc.CardBody([
+            html.H6("Wilayah dengan Kasus Terbanyak", className="fw-bold"),
+            html.H4(f"{top_area_all}", className="mb-0")
+        ])
+    ], style={**card_style_common, 'backgroundColor': '#E5DBFF', 'color': '#2B1B4A'})
+
+    return [
+        dbc.Col(card_total, width=4),
+        dbc.Col(card_topcrime, width=4),
+        dbc.Col(card_toparea, width=4)
+    ]
+
+# the national cards never depend on the selected area
+insight_umum_row = build_national_cards()
 
 # =========================
-# SUMMARY DF from aggregated
+# HOTSPOT TOP 10 AREA (area x hour, same engine as 01_final, computed once at load)
 # =========================
-if not df_agg.empty:
-    # pick only expected cols (if exist)
-    keep_cols = [c for c in ['area_name', 'year_occ', 'total_crimes', 'police_count', 'crimes_per_police'] if c in df_agg.columns]
-    # ensure at least area_name present
-    if 'area_name' not in keep_cols:
-        df_summary = pd.DataFrame(columns=['area_name', 'year_occ', 'total_crimes', 'police_count', 'crimes_per_police'])
-    else:
-        # add missing columns with defaults
-        df_summary = df_agg.copy()
-        for col in ['year_occ', 'total_crimes', 'police_count', 'crimes_per_police']:
-            if col not in df_summary.columns:
-                if col == 'year_occ':
-                    df_summary[col] = pd.NA
-                elif col in ['total_crimes', 'police_count']:
-                    df_summary[col] = 0
-                else:
-                    df_summary[col] = np.nan
-        df_summary = df_summary[['area_name', 'year_occ', 'total_crimes', 'police_count', 'crimes_per_police']].copy()
-        df_summary['total_crimes'] = pd.to_numeric(df_summary['total_crimes'], errors='coerce').fillna(0).astype(int)
-        df_summary['police_count'] = pd.to_numeric(df_summary['police_count'], errors='coerce').fillna(0).astype(int)
-else:
-    df_summary = pd.DataFrame(columns=['area_name', 'year_occ', 'total_crimes', 'police_count', 'crimes_per_police'])
+def build_hotspot_fig():
+    table = hotspot_table(df_detail, top=TOP_AREAS) if ('area_name' in df_detail.columns and not df_detail.empty) else pd.DataFrame()
+    if table.empty or table.to_numpy().sum() == 0:
+        fig = go.Figure()
+        fig.update_layout(title="Tidak ada informasi wilayah/jam", paper_bgcolor='white', plot_bgcolor='white')
+        return fig
+    fig_hot = px.imshow(table, x=list(range(0, 24)), y=list(table.index), color_continuous_scale='YlOrRd',
+                        labels=dict(x="Jam Kejadian (0–23)", y="Nama Area", color="Jumlah Kejahatan"),
+                        title=f"Heatmap Hotspot & Waktu Rawan Kejahatan (Top {TOP_AREAS} Area)", aspect='auto')
+    fig_hot.update_xaxes(dtick=1)
+    fig_hot.update_layout(height=480, margin=dict(t=50))
+    return fig_hot
+
+with span('load.hotspot'):
+    hotspot_fig = build_hotspot_fig()
 
 # =========================
 # DASH APP LAYOUT (final: only area filter)
@@ -183,6 +255,12 @@ preferred_cols = ['date_rptd', 'date_time_occ', 'area_name', 'rpt_dist_no', 'par
 table_cols = [c for c in preferred_cols if c in df_detail.columns]
 if not table_cols and not df_detail.empty:
     table_cols = list(df_detail.columns[:8])
+# server-side filter/sort/paging over the whole detail table
+with span('load.table_index'):
+    table_index = build_table_index(df_detail, table_cols)
+TABLE_PAGE_SIZE = 10
+
+date_min, date_max = date_bounds(filter_idx)
 
 app.layout = dbc.Container([
     html.H1("🚨 Crime Monitoring Dashboard Dinamis", className="text-center my-3"),
@@ -197,8 +275,30 @@ app.layout = dbc.Container([
                              clearable=False), width=6),
     ], className="mb-3"),
 
-    # Insight Umum (national) - 3 cards (will be filled by callback)
-    dbc.Row(id='insight-umum-row', className="mb-3"),
+    # Extra filters (all optional, combined with the area)
+    dbc.Row([
+        dbc.Col([html.Label("📅 Rentang Tanggal:"),
+                 dcc.DatePickerRange(id='date-range', min_date_allowed=date_min, max_date_allowed=date_max,
+                                     display_format='YYYY-MM-DD', clearable=True)], width=4),
+        dbc.Col([html.Label("🕒 Rentang Jam:"),
+                 dcc.RangeSlider(id='hour-range', min=0, max=23, step=1, value=[0, 23],
+                                 marks={h: f"{h}.00" for h in range(0, 24, 3)})], width=8),
+    ], className="mb-2"),
+    dbc.Row([
+        dbc.Col(dcc.Dropdown(id='crm-select', options=options_for(filter_idx, 'crm'), multi=True,
+                             placeholder="Jenis kejahatan"), width=4),
+        dbc.Col(dcc.Dropdown(id='sex-select', options=options_for(filter_idx, 'vict_sex'), multi=True,
+                             placeholder="Jenis kelamin korban"), width=2),
+        dbc.Col(dcc.Dropdown(id='descent-select', options=options_for(filter_idx, 'vict_descent'), multi=True,
+                             placeholder="Keturunan korban"), width=2),
+        dbc.Col(dcc.Dropdown(id='agebin-select', options=options_for(filter_idx, 'vict_age_bin'), multi=True,
+                             placeholder="Kelompok umur"), width=2),
+        dbc.Col(dcc.Dropdown(id='status-select', options=options_for(filter_idx, 'status'), multi=True,
+                             placeholder="Status kasus"), width=2),
+    ], className="mb-3"),
+
+    # Insight Umum (national) - 3 cards (static, computed at load)
+    dbc.Row(insight_umum_row, id='insight-umum-row', className="mb-3"),
 
     # Insight Wilayah
     dbc.Row([
@@ -218,6 +318,27 @@ app.layout = dbc.Container([
         dbc.Col(dcc.Graph(id='heatmap-day-hour', style={'height': '520px'}), width=12)
     ], className="mb-3"),
 
+    # Hotspot of the top areas (national, static)
+    dbc.Row([
+        dbc.Col(dcc.Graph(id='hotspot-top-areas', figure=hotspot_fig, style={'height': '480px'}), width=12)
+    ], className="mb-3"),
+
+    # Trend (follows area, crime type and date range)
+    dbc.Row([
+        dbc.Col(dbc.Card([
+            dbc.CardHeader("Tren Kejahatan"),
+            dbc.CardBody([
+                dcc.RadioItems(id='trend-tier',
+                               options=[{'label': ' Otomatis', 'value': 'auto'},
+                                        {'label': ' Harian', 'value': 'D'},
+                                        {'label': ' Mingguan', 'value': 'W'},
+                                        {'label': ' Bulanan', 'value': 'M'}],
+                               value='auto', inline=True, inputStyle={'marginLeft': '12px'}),
+                dcc.Graph(id='trend-chart', style={'height': '420px'})
+            ])
+        ]), width=12)
+    ], className="mb-3"),
+
     # Map + Crime Chart
     dbc.Row([
         dbc.Col(dcc.Graph(id='map-chart', style={'height': '480px'}), width=6),
@@ -233,10 +354,14 @@ app.layout = dbc.Container([
     dash_table.DataTable(
         id='data-table',
         columns=[{"name": c, "id": c} for c in table_cols],
-        page_size=10,
-        filter_action='native',
-        sort_action='native',
+        page_current=0,
+        page_size=TABLE_PAGE_SIZE,
+        page_action='custom',
+        filter_action='custom',
+        filter_query='',
+        sort_action='custom',
         sort_mode='multi',
+        sort_by=[],
         row_selectable='multi',
         style_table={'overflowX': 'auto', 'maxHeight': '400px'},
         style_cell={'textAlign': 'left', 'padding': '6px', 'fontFamily': 'Arial'},
@@ -245,105 +370,76 @@ app.layout = dbc.Container([
 ], fluid=True)
 
 # =========================
-# CALLBACKS (single input: area-select)
+# CALLBACKS (one per output, all driven by area-select)
 # =========================
-@app.callback(
-    [Output('insight-umum-row', 'children'),
-     Output('insight-text-top', 'children'),
-     Output('police-vs-crime-fig', 'figure'),
-     Output('heatmap-day-hour', 'figure'),
-     Output('map-chart', 'figure'),
-     Output('crime-chart', 'figure'),
-     Output('premis-chart', 'figure'),
-     Output('age-chart', 'figure'),
-     Output('data-table', 'data')],
-    [Input('area-select', 'value')]
-)
-def update_all(selected_area):
-    def empty_fig(title="Tidak ada data"):
-        fig = go.Figure()
-        fig.update_layout(title=title, paper_bgcolor='white', plot_bgcolor='white')
-        return fig
-
-    # --- Insight Umum (national) ---
-    total_all = int(len(df_detail)) if not df_detail.empty else 0
-
-    # --- MODIFY: take top area from aggregated df (df_summary / df_agg) used by police vs crimes chart
-    if not df_summary.empty and 'total_crimes' in df_summary.columns and df_summary['total_crimes'].sum() > 0:
-        try:
-            top_area_all = df_summary.sort_values('total_crimes', ascending=False).iloc[0]['area_name']
-        except Exception:
-            top_area_all = df_detail['area_name'].value_counts().idxmax() if (not df_detail.empty and 'area_name' in df_detail.columns) else "-"
-    else:
-        top_area_all = df_detail['area_name'].value_counts().idxmax() if (not df_detail.empty and 'area_name' in df_detail.columns) else "-"
-
-    top_crime_all = df_detail['crm'].mode()[0] if ('crm' in df_detail.columns and not df_detail['crm'].dropna().empty) else "-"
-
-    # Build three colored cards (pastel palette)
-    card_style_common = {
-        'borderRadius': '10px',
-        'boxShadow': '0 4px 8px rgba(0,0,0,0.08)',
-        'padding': '6px'
-    }
-    card_total = dbc.Card([
-        dbc.CardBody([
-            html.H6("Total Kasus Semua Wilayah", className="fw-bold"),
-            html.H3(f"{total_all}", className="mb-0")
-        ])
-    ], style={**card_style_common, 'backgroundColor': '#A5D8FF', 'color': '#05233B'})
-
-    card_topcrime = dbc.Card([
-        dbc.CardBody([
-            html.H6("Jenis Kejahatan Terbanyak Nasional", className="fw-bold"),
-            html.H4(f"{top_crime_all}", className="mb-0")
-        ])
-    ], style={**card_style_common, 'backgroundColor': '#C3FAE8', 'color': '#053028'})
-
-    card_toparea = dbc.Card([
-        dbc.CardBody([
-            html.H6("Wilayah dengan Kasus Terbanyak", className="fw-bold"),
-            html.H4(f"{top_area_all}", className="mb-0")
-        ])
-    ], style={**card_style_common, 'backgroundColor': '#E5DBFF', 'color': '#2B1B4A'})
-
-    insight_umum_row = [
-        dbc.Col(card_total, width=4),
-        dbc.Col(card_topcrime, width=4),
-        dbc.Col(card_toparea, width=4)
-    ]
-
-    # --- Filter detail by selected area (all visuals driven by this) ---
-    dff = df_detail.copy()
-    if selected_area is not None and selected_area != "":
-        dff = dff[dff['area_name'] == selected_area]
-
-    # --- Insight Wilayah ---
-    total_kasus = int(len(dff)) if not dff.empty else 0
-    top_crime = dff['crm'].mode()[0] if ('crm' in dff.columns and not dff['crm'].dropna().empty) else "-"
-    peak_day = dff['day_name'].mode()[0] if ('day_name' in dff.columns and not dff['day_name'].dropna().empty) else "-"
-    peak_hour = int(dff['hour_occ'].mode()[0]) if ('hour_occ' in dff.columns and not dff['hour_occ'].dropna().empty) else "-"
-    if 'vict_age' in dff.columns and not dff['vict_age'].dropna().empty:
-        avg_age = pd.to_numeric(dff['vict_age'], errors='coerce').mean()
-        avg_age_int = int(round(avg_age)) if not np.isnan(avg_age) else "-"
-    else:
-        avg_age_int = "-"
-
-    # compute ratio (cases per police) for the selected area using df_summary if possible
+# Each output has its own callback, so the browser paints every chart as soon
+# as it is ready instead of waiting for the slowest one; the threaded server
+# runs them concurrently. Results are cached per (filters, data version, output),
+# where the filters (from filter_key) always include the area.
+def empty_fig(title="Tidak ada data"):
+    fig = go.Figure()
+    fig.update_layout(title=title, paper_bgcolor='white', plot_bgcolor='white')
+    return fig
+
+FILTER_INPUTS = [Input('area-select', 'value'),
+                 Input('date-range', 'start_date'),
+                 Input('date-range', 'end_date'),
+                 Input('hour-range', 'value'),
+                 Input('crm-select', 'value'),
+                 Input('sex-select', 'value'),
+                 Input('descent-select', 'value'),
+                 Input('agebin-select', 'value'),
+                 Input('status-select', 'value')]
+
+def current_filters(selected_area, start_date, end_date, hour_range, crm, vict_sex, vict_descent, vict_age_bin, status):
+    return filter_key(selected_area, start_date, end_date, hour_range, crm=crm, vict_sex=vict_sex,
+                      vict_descent=vict_descent, vict_age_bin=vict_age_bin, status=status)
+
+# one computation per filter key, shared by the callbacks that ask for it at the same time
+filtered_entries = ResultCache(maxsize=64)
+
+def filtered_entry(key):
+    return filtered_entries.get_or_compute(key, lambda: build_filtered_entry(key))
+
+def build_filtered_entry(key):
+    with span('filter'):
+        rows = select_rows(filter_idx, key)
+    with span('aggregate'):
+        return build_entry(df_detail, np.arange(len(df_detail)) if rows is None else rows)
+
+def area_entry(key):
+    # without extra filters the precomputed cube entry is used
+    if is_filtered(key):
+        return filtered_entry(key)
+    if key[0] is not None:
+        return area_cube['areas'].get(key[0])
+    return area_cube['all']
+
+def cached_output(key, kind, build):
+    with request_span(kind, key[0]):
+        return figure_cache.get_or_compute((key, figure_cache.version, kind), lambda: traced_build(build, key))
+
+def traced_build(build, key):
+    with span('build'):
+        return build(key)
+
+def build_insight_wilayah(key):
+    selected_area = key[0]
+    entry = area_entry(key)
+    total_kasus = entry['total'] if entry else 0
+    top_crime = entry['top_crime'] if entry else "-"
+    peak_day = entry['peak_day'] if entry else "-"
+    peak_hour = entry['peak_hour'] if entry else "-"
+    avg_age_int = int(round(entry['avg_age'])) if (entry and not np.isnan(entry['avg_age'])) else "-"
+
+    # ratio (yearly cases per police, averaged over the years) for the selected area
     ratio_display = "-"
-    if not df_summary.empty and selected_area is not None:
-        row = df_summary[df_summary['area_name'] == selected_area]
-        if not row.empty:
-            val = row['crimes_per_police'].values[0]
-            if not pd.isna(val):
-                ratio_display = f"{val:.2f}"
+    staff = area_staffing.get(selected_area) if selected_area is not None else None
+    if staff and not pd.isna(staff['crimes_per_police']):
+        ratio_display = f"{staff['crimes_per_police']:.2f}"
     # fallback: compute using police_count and total_kasus if available
-    if ratio_display == "-" and not df_summary.empty and selected_area is not None:
-        row = df_summary[df_summary['area_name'] == selected_area]
-        if not row.empty:
-            police_cnt_val = row['police_count'].values[0]
-            police_cnt = int(police_cnt_val) if (not pd.isna(police_cnt_val)) else 0
-            if police_cnt > 0:
-                ratio_display = f"{(total_kasus / police_cnt):.2f}"
+    elif staff and staff['police_count'] > 0:
+        ratio_display = f"{(total_kasus / staff['police_count']):.2f}"
 
     insight_lines = [
         html.P(f"Wilayah: {selected_area}"),
@@ -354,110 +450,285 @@ def update_all(selected_area):
         html.P(f"Rata-rata Umur Korban: {avg_age_int} tahun"),
         html.P(f"Rasio kasus per polisi: {ratio_display}")
     ]
-    insight_wilayah = html.Div(insight_lines)
+    return html.Div(insight_lines)
 
-    # --- Visuals ---
+def build_police_vs_fig(key):
     # police vs crime (global comparison) - highlight selected by opacity
-    if not df_summary.empty:
-        tmp = df_summary[['area_name', 'total_crimes', 'police_count']].copy()
-        tmp = tmp.fillna(0)
-        tmp = tmp.rename(columns={'area_name': 'Area', 'total_crimes': 'Total Crimes', 'police_count': 'Police Count'})
-        df_melt = tmp.melt(id_vars='Area', value_vars=['Total Crimes', 'Police Count'], var_name='Metric', value_name='Value')
-        df_melt['Selected'] = df_melt['Area'] == selected_area
-        police_vs_fig = px.bar(df_melt, x='Area', y='Value', color='Metric', barmode='group', title="Jumlah Kejahatan vs jumlah polisi per area", height=420)
-        for i, d in enumerate(police_vs_fig.data):
-            mask = (df_melt['Metric'] == d.name)
-            # build opacity list aligned with mask order
-            sel_series = df_melt[mask]['Selected'].values
-            police_vs_fig.data[i].marker.opacity = [1.0 if sel else 0.35 for sel in sel_series]
-        police_vs_fig.update_layout(xaxis={'categoryorder': 'total descending'}, margin=dict(t=50))
-    else:
-        police_vs_fig = empty_fig("Tidak ada data ringkasan")
-
+    selected_area = key[0]
+    if df_summary.empty:
+        return empty_fig("Tidak ada data ringkasan")
+    tmp = df_summary[['area_name', 'total_crimes', 'police_count']].copy()
+    tmp = tmp.fillna(0)
+    tmp = tmp.rename(columns={'area_name': 'Area', 'total_crimes': 'Total Crimes', 'police_count': 'Police Count'})
+    df_melt = tmp.melt(id_vars='Area', value_vars=['Total Crimes', 'Police Count'], var_name='Metric', value_name='Value')
+    df_melt['Selected'] = df_melt['Area'] == selected_area
+    police_vs_fig = px.bar(df_melt, x='Area', y='Value', color='Metric', barmode='group', title="Jumlah Kejahatan vs jumlah polisi per area", height=420)
+    for i, d in enumerate(police_vs_fig.data):
+        mask = (df_melt['Metric'] == d.name)
+        # build opacity list aligned with mask order
+        sel_series = df_melt[mask]['Selected'].values
+        police_vs_fig.data[i].marker.opacity = [1.0 if sel else 0.35 for sel in sel_series]
+    police_vs_fig.update_layout(xaxis={'categoryorder': 'total descending'}, margin=dict(t=50))
+    return police_vs_fig
+
+def build_heatmap(key):
     # Heatmap Day x Hour (prominent)
-    if (('day_name' in dff.columns or 'day_of_week' in dff.columns) and 'hour_occ' in dff.columns and not dff.empty):
-        heat = dff.dropna(subset=['hour_occ'])
-        if 'day_of_week' in heat.columns:
-            pivot = heat.groupby(['day_of_week', 'hour_occ']).size().reset_index(name='count')
-            full = pd.MultiIndex.from_product([range(0,7), range(0,24)], names=['day_of_week','hour_occ']).to_frame(index=False)
-            pivot = pd.merge(full, pivot, on=['day_of_week','hour_occ'], how='left').fillna(0)
-            pivot['day_name'] = pivot['day_of_week'].apply(lambda d: calendar.day_name[d])
-            day_order = [calendar.day_name[i] for i in range(0,7)]
-            heatmat = pivot.pivot_table(index='day_name', columns='hour_occ', values='count').reindex(day_order)
-        else:
-            pivot = heat.groupby(['day_name','hour_occ']).size().reset_index(name='count')
-            hours = list(range(0,24))
-            days = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-            full = pd.MultiIndex.from_product([days, hours], names=['day_name','hour_occ']).to_frame(index=False)
-            pivot = pd.merge(full, pivot, on=['day_name','hour_occ'], how='left').fillna(0)
-            heatmat = pivot.pivot_table(index='day_name', columns='hour_occ', values='count').reindex(days)
-
-        fig_heat = px.imshow(heatmat.values, x=list(range(0,24)), y=heatmat.index,
-                             labels=dict(x="Hour of Day", y="Day", color="Count"),
-                             title="Heatmap Hari × Jam (Time Hotspot)", aspect='auto')
-        fig_heat.update_xaxes(dtick=1)
-        fig_heat.update_layout(height=520)
-    else:
-        fig_heat = empty_fig("Tidak ada informasi hari/jam")
-
-    # Map
-    lat_col = 'lat' if 'lat' in dff.columns else ('latitude' if 'latitude' in dff.columns else None)
-    lon_col = 'lon' if 'lon' in dff.columns else ('longitude' if 'longitude' in dff.columns else None)
-    if lat_col and lon_col and not dff[[lat_col, lon_col]].dropna().empty:
-        pts = dff.dropna(subset=[lat_col, lon_col])
-        if pts.shape[0] >= 200:
-            fig_map = px.density_mapbox(pts, lat=lat_col, lon=lon_col, radius=8,
-                                       center=dict(lat=pts[lat_col].mean(), lon=pts[lon_col].mean()),
-                                       zoom=11, title=f"Sebaran Kejahatan di {selected_area}" if selected_area else "Sebaran Kejahatan",
-                                       color_continuous_scale='OrRd')
-            fig_map.update_layout(mapbox_style="carto-positron", margin=dict(t=50))
-        else:
-            fig_map = px.scatter_mapbox(pts, lat=lat_col, lon=lon_col,
-                                       hover_data=[c for c in ['crm','vict_age','status'] if c in pts.columns],
-                                       title=f"Lokasi Kejahatan di {selected_area}" if selected_area else "Lokasi Kejahatan",
-                                       zoom=11, height=480)
-            fig_map.update_layout(mapbox_style="carto-positron", margin=dict(t=50))
-    else:
-        fig_map = empty_fig("Tidak ada data koordinat")
-
+    entry = area_entry(key)
+    if not (entry and entry['day_hour'].sum() > 0):
+        return empty_fig("Tidak ada informasi hari/jam")
+    fig_heat = px.imshow(entry['day_hour'], x=list(range(0,24)), y=DAY_NAMES,
+                         labels=dict(x="Hour of Day", y="Day", color="Count"),
+                         title="Heatmap Hari × Jam (Time Hotspot)", aspect='auto')
+    fig_heat.update_xaxes(dtick=1)
+    fig_heat.update_layout(height=520)
+    return fig_heat
+
+def build_crime_fig(key):
     # Crime chart (top 12) - dynamic by area
-    if 'crm' in dff.columns and not dff['crm'].dropna().empty:
-        crime_counts = dff['crm'].value_counts().nlargest(12).reset_index()
-        crime_counts.columns = ['Jenis', 'Jumlah']
-        fig_crime = px.bar(crime_counts, x='Jenis', y='Jumlah', title="12 Jenis Kejahatan teratas")
-    else:
-        fig_crime = empty_fig("Tidak ada data jenis kejahatan")
-
+    entry = area_entry(key)
+    if not (entry and not entry['crm_counts'].empty):
+        return empty_fig("Tidak ada data jenis kejahatan")
+    crime_counts = entry['crm_counts'].nlargest(12).reset_index()
+    crime_counts.columns = ['Jenis', 'Jumlah']
+    return px.bar(crime_counts, x='Jenis', y='Jumlah', title="12 Jenis Kejahatan teratas")
+
+def build_premis_fig(key):
     # Premis chart (top 10)
-    premis_col = None
-    for c in ['premis', 'premis_desc', 'location', 'premise']:
-        if c in dff.columns:
-            premis_col = c
-            break
-    if premis_col and not dff[premis_col].dropna().empty:
-        premis_counts = dff[premis_col].value_counts().nlargest(10).reset_index()
-        premis_counts.columns = ['Lokasi', 'Jumlah']
-        fig_premis = px.bar(premis_counts, x='Lokasi', y='Jumlah', title="Tempat / Premis Kejadian (Top 10)")
-    else:
-        fig_premis = empty_fig("Tidak ada data lokasi/premis")
-
-    # Age chart
-    if 'vict_age' in dff.columns and not dff['vict_age'].dropna().empty:
-        fig_age = px.histogram(dff, x='vict_age', nbins=20, title="Distribusi Umur Korban")
-    elif 'vict_age_bin' in dff.columns and not dff['vict_age_bin'].dropna().empty:
-        age_counts = dff['vict_age_bin'].value_counts().reset_index().rename(columns={'index': 'Age Group', 'vict_age_bin': 'Count'})
-        fig_age = px.bar(age_counts, x='Age Group', y='Count', title="Distribusi Kelompok Umur Korban")
-    else:
-        fig_age = empty_fig("Tidak ada data umur korban")
+    entry = area_entry(key)
+    if not (entry and entry['premis_col'] and not entry['premis_counts'].empty):
+        return empty_fig("Tidak ada data lokasi/premis")
+    premis_counts = entry['premis_counts'].nlargest(10).reset_index()
+    premis_counts.columns = ['Lokasi', 'Jumlah']
+    return px.bar(premis_counts, x='Lokasi', y='Jumlah', title="Tempat / Premis Kejadian (Top 10)")
+
+def build_age_fig(key):
+    # Age chart (pre-binned histogram)
+    entry = area_entry(key)
+    if entry and entry['age_n'] > 0:
+        age_counts = pd.DataFrame({'vict_age': (AGE_EDGES[:-1] + AGE_EDGES[1:]) / 2, 'count': entry['age_hist']})
+        fig_age = px.bar(age_counts, x='vict_age', y='count', title="Distribusi Umur Korban")
+        fig_age.update_traces(width=AGE_EDGES[1] - AGE_EDGES[0])
+        fig_age.update_layout(bargap=0)
+        return fig_age
+    if entry and not entry['age_bin_counts'].empty:
+        age_counts = entry['age_bin_counts'].reset_index()
+        age_counts.columns = ['Age Group', 'Count']
+        return px.bar(age_counts, x='Age Group', y='Count', title="Distribusi Kelompok Umur Korban")
+    return empty_fig("Tidak ada data umur korban")
+
+# output kind -> builder, also used for prewarming
+AREA_BUILDERS = {
+    'insight': build_insight_wilayah,
+    'police_vs': build_police_vs_fig,
+    'heatmap': build_heatmap,
+    'crime': build_crime_fig,
+    'premis': build_premis_fig,
+    'age': build_age_fig,
+}
+
+@app.callback(Output('insight-text-top', 'children'), FILTER_INPUTS)
+def update_insight(*filters):
+    return cached_output(current_filters(*filters), 'insight', build_insight_wilayah)
+
+@app.callback(Output('police-vs-crime-fig', 'figure'), Input('area-select', 'value'))
+def update_police_vs(selected_area):
+    # only the area highlight depends on the inputs
+    return cached_output(filter_key(selected_area), 'police_vs', build_police_vs_fig)
+
+@app.callback(Output('heatmap-day-hour', 'figure'), FILTER_INPUTS)
+def update_heatmap(*filters):
+    return cached_output(current_filters(*filters), 'heatmap', build_heatmap)
+
+def build_trend_fig(selected_area, start_date, end_date, crm, tier):
+    if not trend_tiers or trend_rollup['daily'].empty:
+        return empty_fig("Tidak ada data tren")
+    if tier == 'auto':
+        lo = start_date or trend_rollup['daily']['day'].min()
+        hi = end_date or trend_rollup['daily']['day'].max()
+        tier = pick_tier(lo, hi)
+    with span('query'):
+        trend = trend_with_stats(trend_tiers, tier, selected_area or None, crm or None, start_date, end_date)
+    if trend.empty:
+        return empty_fig("Tidak ada data tren")
+    label = {'D': 'Harian', 'W': 'Mingguan', 'M': 'Bulanan'}[tier]
+    fig_trend = go.Figure()
+    fig_trend.add_trace(go.Bar(x=trend.index, y=trend['count'], name=f"Jumlah {label.lower()}",
+                               marker_color='#A5D8FF'))
+    fig_trend.add_trace(go.Scatter(x=trend.index, y=trend['rolling'], name="Rata-rata bergerak",
+                                   mode='lines', line=dict(color='#1C7ED6', width=2)))
+    fig_trend.add_trace(go.Scatter(x=trend.index, y=trend['prev_year'], name="Tahun sebelumnya",
+                                   mode='lines', line=dict(color='#868E96', dash='dash')))
+    title = f"Tren {label} Kejahatan di {selected_area}" if selected_area else f"Tren {label} Kejahatan"
+    fig_trend.update_layout(title=title, height=420, margin=dict(t=50), bargap=0,
+                            legend=dict(orientation='h', y=-0.15))
+    return fig_trend
+
+@app.callback(
+    Output('trend-chart', 'figure'),
+    [Input('area-select', 'value'),
+     Input('date-range', 'start_date'),
+     Input('date-range', 'end_date'),
+     Input('crm-select', 'value'),
+     Input('trend-tier', 'value')]
+)
+def update_trend(selected_area, start_date, end_date, crm, tier):
+    crm = tuple(sorted(crm)) if crm else None
+    with request_span('trend', selected_area):
+        return figure_cache.get_or_compute(
+            (('trend', selected_area, start_date, end_date, crm, tier), figure_cache.version, 'trend'),
+            lambda: build_trend_fig(selected_area, start_date, end_date, crm, tier))
 
-    # Table data (limit for responsiveness)
-    table_data = dff[table_cols].head(200).to_dict('records') if not dff.empty else []
+@app.callback(Output('crime-chart', 'figure'), FILTER_INPUTS)
+def update_crime(*filters):
+    return cached_output(current_filters(*filters), 'crime', build_crime_fig)
 
-    return insight_umum_row, insight_wilayah, police_vs_fig, fig_heat, fig_map, fig_crime, fig_premis, fig_age, table_data
+@app.callback(Output('premis-chart', 'figure'), FILTER_INPUTS)
+def update_premis(*filters):
+    return cached_output(current_filters(*filters), 'premis', build_premis_fig)
+
+@app.callback(Output('age-chart', 'figure'), FILTER_INPUTS)
+def update_age(*filters):
+    return cached_output(current_filters(*filters), 'age', build_age_fig)
+
+@app.callback(
+    [Output('data-table', 'data'),
+     Output('data-table', 'page_count'),
+     Output('data-table', 'page_current')],
+    [Input('data-table', 'page_current'),
+     Input('data-table', 'page_size'),
+     Input('data-table', 'filter_query'),
+     Input('data-table', 'sort_by')] + FILTER_INPUTS
+)
+def update_table(page_current, page_size, filter_query, sort_by, *filters):
+    # a new area or filter starts again at the first page
+    if ctx.triggered_id not in (None, 'data-table') or (ctx.triggered_prop_ids and 'data-table.filter_query' in ctx.triggered_prop_ids):
+        page_current = 0
+    if df_detail.empty:
+        return [], 1, 0
+    key = current_filters(*filters)
+    with request_span('table', key[0]):
+        with span('filter'):
+            rows = select_rows(filter_idx, key)
+        with span('query'):
+            try:
+                selected = run_query(table_index, rows, filter_query, sort_by, cache_key=key)
+            except ValueError as e:
+                # an unsupported query shows no rows rather than the unfiltered table
+                print(f"❌ Fail filter query {filter_query!r}: {e}")
+                return [], 1, 0
+        page, page_count = page_rows(selected, page_current, page_size or TABLE_PAGE_SIZE)
+        page_current = min(page_current or 0, page_count - 1)
+        if not len(page) and len(selected):
+            page, _ = page_rows(selected, page_current, page_size or TABLE_PAGE_SIZE)
+        with span('records'):
+            return to_display(df_detail.iloc[page][table_cols]).to_dict('records'), page_count, page_current
+
+# =========================
+# MAP (binned cells, refined on zoom / pan)
+# =========================
+filtered_map_levels = ResultCache(maxsize=32)
+
+def filtered_levels(key):
+    return filtered_map_levels.get_or_compute(key, lambda: build_filtered_levels(key))
+
+def build_filtered_levels(key):
+    rows = select_rows(filter_idx, key)
+    if rows is None:
+        return map_pyramid['all']
+    return levels_for_rows(map_points, rows) if map_points is not None else None
+
+def map_levels(key):
+    if is_filtered(key):
+        return filtered_levels(key)
+    return map_pyramid['areas'].get(key[0]) if key[0] else map_pyramid['all']
+
+@app.callback(
+    Output('map-chart', 'figure'),
+    [Input('map-chart', 'relayoutData')] + FILTER_INPUTS
+)
+def update_map(relayout, *filters):
+    key = current_filters(*filters)
+    with request_span('map', key[0]):
+        with span('levels'):
+            levels = map_levels(key)
+        n_points = total_points(levels)
+        if n_points == 0:
+            return empty_fig("Tidak ada data koordinat")
+
+        # a new area/filter resets the view; otherwise follow the user's zoom/pan
+        zoom, bounds = viewport_from_relayout(relayout) if ctx.triggered_id == 'map-chart' else (None, None)
+        if zoom is None and bounds is None:
+            return figure_cache.get_or_compute((key, figure_cache.version, 'map'),
+                                               lambda: render_map(key, levels, n_points))
+        return render_map(key, levels, n_points, zoom, bounds)
+
+def render_map(key, levels, n_points, zoom=None, bounds=None):
+    with span('build'):
+        return _render_map(key, levels, n_points, zoom, bounds)
+
+def _render_map(key, levels, n_points, zoom=None, bounds=None):
+    selected_area = key[0]
+    center_lat, center_lon = center_of(levels)
+
+    if n_points < MAP_SCATTER_MAX:
+        if is_filtered(key):
+            rows = select_rows(filter_idx, key)
+            rows = slice(None) if rows is None else rows
+        else:
+            rows = area_rows.get(selected_area, []) if selected_area else slice(None)
+        pts = df_detail.iloc[rows]
+        pts = pts[(pts[lat_col] != 0) & (pts[lon_col] != 0)].dropna(subset=[lat_col, lon_col])
+        fig_map = px.scatter_mapbox(to_display(pts), lat=lat_col, lon=lon_col,
+                                    hover_data=[c for c in ['crm','vict_age','status'] if c in pts.columns],
+                                    title=f"Lokasi Kejahatan di {selected_area}" if selected_area else "Lokasi Kejahatan",
+                                    zoom=11, height=480)
+    else:
+        cells, level = query_cells(levels, zoom=zoom if zoom is not None else 11, bounds=bounds)
+        fig_map = px.density_mapbox(cells, lat='lat', lon='lon', z='count', radius=10,
+                                    center=dict(lat=center_lat, lon=center_lon),
+                                    zoom=11, title=f"Sebaran Kejahatan di {selected_area}" if selected_area else "Sebaran Kejahatan",
+                                    color_continuous_scale='OrRd')
+    # keep the user's zoom/pan when the figure is refreshed with finer cells
+    fig_map.update_layout(mapbox_style="carto-positron", margin=dict(t=50), uirevision=selected_area)
+    return fig_map
+
+# =========================
+# FIGURE CACHE PREWARM + STATS
+# =========================
+if os.environ.get('FIGURE_CACHE_PREWARM', '1') == '1':
+    prewarm(figure_cache,
+            [((filter_key(a), figure_cache.version, kind), (lambda a=a, build=build: build(filter_key(a))))
+             for a in areas for kind, build in AREA_BUILDERS.items()] +
+            [((filter_key(a), figure_cache.version, 'map'),
+              (lambda a=a: render_map(filter_key(a), map_pyramid['areas'].get(a), total_points(map_pyramid['areas'].get(a)))))
+             for a in areas if total_points(map_pyramid['areas'].get(a)) > 0],
+            workers=int(os.environ.get('FIGURE_CACHE_WORKERS', 4)))
+
+def is_local_request():
+    return flask_request.remote_addr in ('127.0.0.1', '::1')
+
+@app.server.route('/cache-stats')
+def cache_stats():
+    if not is_local_request():
+        return {'error': 'local only'}, 403
+    return figure_cache.stats()
+
+@app.server.route('/metrics')
+def metrics():
+    # spans name areas and code paths, so only answered on this machine;
+    # ?trace=on|off switches tracing without a restart, ?reset=1 clears the windows
+    if not is_local_request():
+        return {'error': 'local only'}, 403
+    if flask_request.args.get('trace') in ('on', 'off'):
+        tracer.configure(enabled=flask_request.args['trace'] == 'on')
+    if flask_request.args.get('reset') == '1':
+        tracer.reset()
+    return tracer.metrics()
 
 # =========================
 # RUN APP
 # =========================
 if __name__ == '__main__':
     print("🚀 Dashboard running at http://127.0.0.1:8050")
-    app.run(debug=True)
+    # threaded so the per-output callbacks are served concurrently
+    app.run(debug=True, threaded=True)
@@ -0,0 +1,122 @@
+# data_cache.py
+# Columnar (Parquet) cache for the cleaned dashboard frames.
+#
+# Reading the CSVs and re-running normalize_cols / ensure_area_name /
+# try_parse_dates on every worker start is what makes cold start slow. The
+# cleaned frame (typed by `prepare`, see schema.py) is written once to a
+# Parquet file keyed on the source file's content hash; later starts
+# memory-map it and read only the columns the dashboard needs.
+import os
+import json
+import hashlib
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # cache is optional, dashboard falls back to plain CSV
+    pq = None
+
+CACHE_VERSION = 2
+
+
+# =========================
+# Source fingerprint
+# =========================
+def file_sha1(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_stem(source):
+    """File stem plus a short hash of the full path, so two sources with the
+    same file name (e.g. data_dir and store Police_Crime.csv) don't collide."""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return f"{stem}-{hashlib.sha1(os.path.abspath(source).encode()).hexdigest()[:8]}"
+
+
+def _meta_path(source, cache_dir):
+    return os.path.join(cache_dir, f"{_cache_stem(source)}.meta.json")
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_meta(meta_path, meta):
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, meta_path)
+
+
+def source_key(source, cache_dir):
+    """Content hash of `source`; re-hashes only when size/mtime changed."""
+    st = os.stat(source)
+    meta_path = _meta_path(source, cache_dir)
+    meta = _read_meta(meta_path)
+    if meta.get('size') == st.st_size and meta.get('mtime') == st.st_mtime and meta.get('sha1'):
+        return meta['sha1'], meta
+    meta = {**meta, 'source': os.path.abspath(source), 'size': st.st_size,
+            'mtime': st.st_mtime, 'sha1': file_sha1(source)}
+    return meta['sha1'], meta
+
+
+# =========================
+# Load
+# =========================
+def _read_parquet(path, columns):
+    if columns is not None:
+        present = set(pq.read_schema(path).names)
+        columns = [c for c in columns if c in present]
+    return pd.read_parquet(path, columns=columns, engine='pyarrow', memory_map=True)
+
+
+def load_cached_frame(source, prepare, cache_dir, columns=None, read=pd.read_csv):
+    """Return prepare(read(source)) from the Parquet cache when it is fresh.
+
+    `columns` limits what is read back from the cache (missing names are
+    ignored). Without pyarrow the frame is simply rebuilt from the source.
+    """
+    if pq is None or not os.path.exists(source):
+        return prepare(read(source))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    sha1, meta = source_key(source, cache_dir)
+    cache_path = os.path.join(cache_dir, f"{_cache_stem(source)}-{sha1[:12]}.parquet")
+
+    if meta.get('cache') == os.path.basename(cache_path) and meta.get('version') == CACHE_VERSION \
+            and os.path.exists(cache_path):
+        try:
+            df = _read_parquet(cache_path, columns)
+            # file was touched but content is the same: refresh size/mtime
+            if meta != _read_meta(_meta_path(source, cache_dir)):
+                _write_meta(_meta_path(source, cache_dir), meta)
+            print(f"✅ Loaded cache {cache_path} -> {df.shape}")
+            return df
+        except Exception as e:
+            print(f"❌ Fail load cache {cache_path}: {e}")
+
+    df = prepare(read(source))
+    try:
+        tmp = cache_path + '.tmp'
+        df.to_parquet(tmp, engine='pyarrow', index=False)
+        os.replace(tmp, cache_path)
+        old = meta.get('cache')
+        if old and old != os.path.basename(cache_path) and os.path.exists(os.path.join(cache_dir, old)):
+            os.remove(os.path.join(cache_dir, old))
+        _write_meta(_meta_path(source, cache_dir), {**meta, 'cache': os.path.basename(cache_path), 'version': CACHE_VERSION})
+        print(f"✅ Saved cache {cache_path} -> {df.shape}")
+    except Exception as e:
+        print(f"❌ Fail save cache {cache_path}: {e}")
+
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
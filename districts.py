@@ -0,0 +1,72 @@
+# districts.py
+# Council-district assignment for crime coordinates.
+#
+# Replaces the per-row `df.apply(lambda row: Point(row['LON'], row['LAT']))`
+# + gpd.sjoin step of 00_prototype.ipynb: the geojson is loaded once, indexed
+# with a per-district bounding-box table and points are matched in vectorized
+# chunks with shapely.contains_xy (no Point objects are created).
+import os
+import json
+from functools import lru_cache
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+DEFAULT_GEOJSON = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'data', 'raw', 'LA_City_Council_Districts_(Adopted_2021).geojson')
+DISTRICT_FIELD = 'District'
+CHUNK_SIZE = 200_000
+
+
+@lru_cache(maxsize=4)
+def load_districts(path=DEFAULT_GEOJSON, field=DISTRICT_FIELD):
+    """(district ids, prepared polygons, per-polygon bounds, total bounds)."""
+    with open(path, encoding='utf-8') as f:
+        gj = json.load(f)
+    ids, geoms = [], []
+    for feat in gj['features']:
+        if not feat.get('geometry'):
+            continue
+        ids.append(feat['properties'][field])
+        geoms.append(shape(feat['geometry']))
+    geoms = np.array(geoms, dtype=object)
+    shapely.prepare(geoms)
+    return np.array(ids, dtype='float64'), geoms, shapely.bounds(geoms), shapely.total_bounds(geoms)
+
+
+def assign_districts(lat, lon, path=DEFAULT_GEOJSON, chunk_size=CHUNK_SIZE):
+    """District id per coordinate (NaN when outside every district).
+
+    NaN and (0, 0) coordinates, which LAPD uses for unknown locations, and
+    points outside the districts' bounding box are skipped without a
+    polygon test. On shared borders the first matching district wins.
+    """
+    ids, geoms, bounds, (xmin, ymin, xmax, ymax) = load_districts(path)
+    lat = np.asarray(lat, dtype='float64')
+    lon = np.asarray(lon, dtype='float64')
+    out = np.full(len(lat), np.nan)
+
+    candidate = ~np.isnan(lat) & ~np.isnan(lon) & (lat != 0) & (lon != 0) & \
+        (lon >= xmin) & (lon <= xmax) & (lat >= ymin) & (lat <= ymax)
+    idx = np.flatnonzero(candidate)
+    for start in range(0, len(idx), chunk_size):
+        part = idx[start:start + chunk_size]
+        x, y = lon[part], lat[part]
+        found = np.zeros(len(part), dtype=bool)
+        for i, geom in enumerate(geoms):
+            bx0, by0, bx1, by1 = bounds[i]
+            m = np.flatnonzero(~found & (x >= bx0) & (x <= bx1) & (y >= by0) & (y <= by1))
+            if len(m) == 0:
+                continue
+            hit = m[shapely.contains_xy(geom, x[m], y[m])]
+            out[part[hit]] = ids[i]
+            found[hit] = True
+    return out
+
+
+def add_district_column(df, lat_col='LAT', lon_col='LON', out_col='DISTRICT', path=DEFAULT_GEOJSON):
+    """Return a copy of df with `out_col` filled by assign_districts()."""
+    df = df.copy()
+    df[out_col] = assign_districts(df[lat_col].to_numpy(), df[lon_col].to_numpy(), path)
+    return df
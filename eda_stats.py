@@ -0,0 +1,429 @@
+# eda_stats.py
+# Single-pass statistics for the 01_final.ipynb analyses.
+#
+# The notebook runs describe(), mode() and var() as separate passes, sorts
+# the whole column for every ECDF and re-parses date_time_occ for every
+# hour-of-day test. Here one pass over a frame (or over the chunks of
+# stream_clean.iter_clean) feeds, per column and optionally per area:
+#
+#   - Moments: count/mean/M2/M3/M4/min/max, merged across chunks and groups
+#     with the pairwise update of Pebay (2008), so var/std/skew/kurtosis are
+#     exact without a second pass
+#   - a QuantileSketch (a histogram on a `resolution` grid): quartiles,
+#     median and mode within resolution / 2 of the exact value (exact for
+#     integer columns at resolution 1), and the ECDF as cumulative counts
+#     over the distinct cells instead of a full sort
+#
+# The normality test on vict_age and the uniformity test on hour-of-day are
+# computed from those summaries, the hotspot tables from one bincount over
+# the area x hour (x day) codes. The hour comes from hour_occ, which
+# prepare_detail already derives, so date_time_occ is parsed at most once.
+import numpy as np
+import pandas as pd
+
+from sketch import QuantileSketch
+
+try:
+    from scipy import stats as sps
+except ImportError:   # p-values are left out without scipy
+    sps = None
+
+BY_COL = 'area_name'
+HOUR_COL = 'hour_occ'
+DATE_COL = 'date_time_occ'
+ALL = '(all)'
+# grid of the quantile/mode/ECDF histogram per column (default 1: integer columns are exact)
+DEFAULT_RESOLUTION = {'lat': 1e-4, 'lon': 1e-4, 'latitude': 1e-4, 'longitude': 1e-4}
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+TOP_AREAS = 10
+
+
+# =========================
+# Moments (vectorized over groups)
+# =========================
+class Moments:
+    """Streaming count, mean, central moments M2..M4, min and max for `size` groups."""
+
+    def __init__(self, size=1):
+        self.n = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.m3 = np.zeros(size)
+        self.m4 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def grow(self, size):
+        extra = size - len(self.n)
+        if extra > 0:
+            for name, fill in [('n', 0), ('mean', 0), ('m2', 0), ('m3', 0), ('m4', 0),
+                               ('min', np.inf), ('max', -np.inf)]:
+                setattr(self, name, np.concatenate([getattr(self, name), np.full(extra, fill, dtype='float64')]))
+        return self
+
+    def update(self, values, codes=None):
+        """Add values (NaN ignored); codes[i] is the group of values[i]."""
+        x = np.asarray(values, dtype='float64')
+        codes = np.zeros(len(x), dtype='int64') if codes is None else np.asarray(codes, dtype='int64')
+        ok = ~np.isnan(x)
+        x, codes = x[ok], codes[ok]
+        if not len(x):
+            return self
+        size = len(self.n)
+        b = Moments(size)
+        b.n = np.bincount(codes, minlength=size).astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            b.mean = np.nan_to_num(np.bincount(codes, x, minlength=size) / b.n)
+        d = x - b.mean[codes]
+        d2 = d * d
+        b.m2 = np.bincount(codes, d2, minlength=size)
+        b.m3 = np.bincount(codes, d2 * d, minlength=size)
+        b.m4 = np.bincount(codes, d2 * d2, minlength=size)
+        np.minimum.at(b.min, codes, x)
+        np.maximum.at(b.max, codes, x)
+        return self.merge(b)
+
+    def merge(self, other):
+        """Pairwise combination (Pebay 2008); other must have the same groups."""
+        na, nb = self.n, other.n
+        n = na + nb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            f = np.where(n > 0, na * nb / np.where(n > 0, n, 1), 0.0)
+            wa = np.where(n > 0, na / np.where(n > 0, n, 1), 0.0)
+            wb = np.where(n > 0, nb / np.where(n > 0, n, 1), 0.0)
+            mean = self.mean + delta * wb
+            m2 = self.m2 + other.m2 + delta ** 2 * f
+            m3 = (self.m3 + other.m3 + delta ** 3 * f * (wa - wb)
+                  + 3 * delta * (wa * other.m2 - wb * self.m2))
+            m4 = (self.m4 + other.m4 + delta ** 4 * f * (wa * wa - wa * wb + wb * wb)
+                  + 6 * delta ** 2 * (wa * wa * other.m2 + wb * wb * self.m2)
+                  + 4 * delta * (wa * other.m3 - wb * self.m3))
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def total(self):
+        """The groups combined into one."""
+        out = Moments(1)
+        for i in range(len(self.n)):
+            out.merge(self.take(i))
+        return out
+
+    def take(self, i):
+        out = Moments(1)
+        for name in ['n', 'mean', 'm2', 'm3', 'm4', 'min', 'max']:
+            setattr(out, name, getattr(self, name)[i:i + 1].copy())
+        return out
+
+    def var(self, ddof=1):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.n > ddof, self.m2 / (self.n - ddof), np.nan)
+
+    def std(self, ddof=1):
+        return np.sqrt(self.var(ddof))
+
+    def skew(self):
+        """Sample skewness g1 (scipy.stats.skew with bias=True)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.m2 > 0, np.sqrt(self.n) * self.m3 / self.m2 ** 1.5, np.nan)
+
+    def kurtosis(self):
+        """Excess kurtosis g2 (scipy.stats.kurtosis with bias=True)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.m2 > 0, self.n * self.m4 / self.m2 ** 2 - 3, np.nan)
+
+
+# =========================
+# Accumulator (moments + histograms per column and group)
+# =========================
+def hour_values(df):
+    """Hour of day of each row: hour_occ if present, else from date_time_occ (parsed once)."""
+    if HOUR_COL in df.columns:
+        return pd.to_numeric(df[HOUR_COL], errors='coerce')
+    if DATE_COL in df.columns:
+        occ = df[DATE_COL]
+        if not pd.api.types.is_datetime64_any_dtype(occ):
+            occ = pd.to_datetime(occ, errors='coerce')
+        return occ.dt.hour
+    return pd.Series(np.nan, index=df.index)
+
+
+class StatsAccumulator:
+    """Moments and quantile sketches of numeric columns, overall or per `by` group.
+
+    update() takes frames (e.g. the chunks of stream_clean.iter_clean) and
+    merge() combines accumulators of different chunks/processes.
+    """
+
+    def __init__(self, columns=None, by=None, resolution=None):
+        self.columns = list(columns) if columns is not None else None
+        self.by = by
+        self.resolution = {**DEFAULT_RESOLUTION, **(resolution or {})}
+        self.groups = {}   # label -> group index (insertion order)
+        self.moments = {}
+        self.sketches = {}   # column -> [QuantileSketch per group]
+
+    def _init_columns(self, df):
+        if self.columns is None:
+            self.columns = [c for c in df.select_dtypes(include='number').columns if c != self.by]
+        size = max(len(self.groups), 1)
+        for c in self.columns:
+            self.moments[c] = Moments(size)
+            self.sketches[c] = [QuantileSketch(self.resolution.get(c, 1.0)) for _ in range(size)]
+
+    def _codes(self, df):
+        if self.by is None:
+            self.groups = self.groups or {ALL: 0}
+            return np.zeros(len(df), dtype='int64')
+        labels, uniques = pd.factorize(df[self.by].astype(str), sort=False)
+        mapping = np.array([self.groups.setdefault(u, len(self.groups)) for u in uniques], dtype='int64')
+        codes = np.full(len(df), -1, dtype='int64')
+        codes[labels >= 0] = mapping[labels[labels >= 0]]
+        return codes
+
+    def _grow(self):
+        size = len(self.groups)
+        for c in self.columns:
+            self.moments[c].grow(size)
+            sketches = self.sketches[c]
+            sketches.extend(QuantileSketch(self.resolution.get(c, 1.0)) for _ in range(size - len(sketches)))
+
+    def update(self, df):
+        if self.columns is None or not self.moments:
+            self._init_columns(df)
+        codes = self._codes(df)
+        self._grow()
+        keep = codes >= 0
+        for c in self.columns:
+            if c == HOUR_COL:
+                values = hour_values(df)
+            elif c in df.columns:
+                values = pd.to_numeric(df[c], errors='coerce')
+            else:
+                continue
+            x = values.to_numpy(dtype='float64')[keep]
+            g = codes[keep]
+            ok = ~np.isnan(x)
+            x, g = x[ok], g[ok]
+            self.moments[c].update(x, g)
+            self._update_sketches(c, x, g)
+        return self
+
+    def _update_sketches(self, column, x, g):
+        """One np.unique over (group, cell) pairs instead of a pass per group."""
+        if not len(x):
+            return
+        sketches = self.sketches[column]
+        cells = np.round(x / sketches[0].resolution).astype('int64')
+        lo = cells.min()
+        span = int(cells.max() - lo) + 1
+        pairs, counts = np.unique(g * span + (cells - lo), return_counts=True)
+        groups = pairs // span
+        bounds = np.flatnonzero(np.diff(groups)) + 1
+        for part, part_counts in zip(np.split(pairs, bounds), np.split(counts, bounds)):
+            sketches[int(part[0] // span)].add_cells(part % span + lo, part_counts)
+
+    def merge(self, other):
+        if not other.moments:
+            return self
+        if not self.moments:
+            self.columns = list(other.columns)
+            self._init_columns(pd.DataFrame(columns=self.columns))
+        # other's groups in this accumulator's numbering
+        remap = np.array([self.groups.setdefault(label, len(self.groups)) for label in other.groups], dtype='int64')
+        self._grow()
+        for c in self.columns:
+            if c not in other.moments:
+                continue
+            aligned = Moments(len(self.groups))
+            src = other.moments[c]
+            for name in ['n', 'mean', 'm2', 'm3', 'm4', 'min', 'max']:
+                getattr(aligned, name)[remap] = getattr(src, name)[:len(remap)]
+            self.moments[c].merge(aligned)
+            for i, j in enumerate(remap):
+                self.sketches[c][j].merge(other.sketches[c][i])
+        return self
+
+    # ---- access ----
+    def sketch(self, column, group=None):
+        """QuantileSketch of a column for one group (None = all groups combined)."""
+        sketches = self.sketches[column]
+        if group is None:
+            out = QuantileSketch(sketches[0].resolution)
+            for s in sketches:
+                out.merge(s)
+            return out
+        return sketches[self.groups[group]]
+
+    def column_moments(self, column, group=None):
+        m = self.moments[column]
+        return m.total() if group is None else m.take(self.groups[group])
+
+    def table(self, include_all=True):
+        """describe()-like table with mode, var, IQR and range (01_final cell 3).
+
+        Index: column, or (group, column) when grouped. q_err is the largest
+        distance of the quantiles/mode from their exact values.
+        """
+        groups = list(self.groups) if self.by is not None else []
+        rows, index = [], []
+        for label in ([None] if include_all or not groups else []) + groups:
+            for c in self.columns:
+                if c not in self.moments:
+                    continue
+                m, s = self.column_moments(c, label), self.sketch(c, label)
+                q = s.quantile([0.25, 0.5, 0.75])
+                rows.append({'count': int(m.n[0]), 'mean': m.mean[0] if m.n[0] else np.nan,
+                             'std': m.std()[0], 'var': m.var()[0],
+                             'min': m.min[0] if m.n[0] else np.nan, '25%': q[0], '50%': q[1], '75%': q[2],
+                             'max': m.max[0] if m.n[0] else np.nan, 'mode': mode(s),
+                             'IQR': q[2] - q[0], 'range': m.max[0] - m.min[0] if m.n[0] else np.nan,
+                             'skew': m.skew()[0], 'kurtosis': m.kurtosis()[0], 'q_err': s.error_bound()})
+                index.append(c if self.by is None else (ALL if label is None else label, c))
+        out = pd.DataFrame(rows, index=pd.MultiIndex.from_tuples(index, names=[self.by, 'column'])
+                           if self.by is not None else pd.Index(index, name='column'))
+        return out
+
+
+def describe(data, columns=None, by=None, resolution=None):
+    """StatsAccumulator over a frame or an iterable of chunks, in one pass."""
+    acc = StatsAccumulator(columns, by, resolution)
+    for chunk in ([data] if isinstance(data, pd.DataFrame) else data):
+        acc.update(chunk)
+    return acc
+
+
+# =========================
+# Histogram-based mode / ECDF
+# =========================
+def mode(sketch):
+    """Most frequent grid value (smallest on ties, like Series.mode().iloc[0])."""
+    if sketch.n == 0:
+        return np.nan
+    counts = sketch.counts.sort_index()
+    return float(counts.idxmax()) * sketch.resolution
+
+
+def ecdf(sketch):
+    """(x, F(x)) at the distinct values: the steps of the notebook's sorted ECDF."""
+    counts = sketch.counts.sort_index()
+    x = counts.index.to_numpy(dtype='float64') * sketch.resolution
+    return x, np.cumsum(counts.to_numpy()) / max(sketch.n, 1)
+
+
+def ks_statistic(sketch, cdf):
+    """Kolmogorov-Smirnov distance between the sketch's ECDF and `cdf`."""
+    x, f = ecdf(sketch)
+    if not len(x):
+        return np.nan
+    before = np.concatenate([[0.0], f[:-1]])
+    theo = cdf(x)
+    return float(max(np.abs(f - theo).max(), np.abs(before - theo).max()))
+
+
+def _normal_cdf(x, mean, std):
+    if sps is not None:
+        return sps.norm.cdf(x, mean, std)
+    from math import erf, sqrt
+    return 0.5 * (1 + np.vectorize(erf)((np.asarray(x) - mean) / (std * sqrt(2))))
+
+
+# =========================
+# Distribution tests (01_final cells 8 and 11)
+# =========================
+def normality_test(acc, column='vict_age', group=None):
+    """Jarque-Bera from the moments and KS against N(mean, std) from the histogram.
+
+    The KS p-value uses the fitted mean/std (no Lilliefors correction) and
+    treats the data as continuous, as the notebook's standardized
+    comparison does; with integer ages it is conservative.
+    """
+    m, s = acc.column_moments(column, group), acc.sketch(column, group)
+    n, mean, std = m.n[0], m.mean[0], m.std(ddof=0)[0]
+    skew, kurt = m.skew()[0], m.kurtosis()[0]
+    jb = n / 6 * (skew ** 2 + kurt ** 2 / 4)
+    ks = ks_statistic(s, lambda x: _normal_cdf(x, mean, std)) if std > 0 else np.nan
+    return {'column': column, 'group': group, 'n': int(n), 'mean': mean, 'std': std, 'skew': skew,
+            'kurtosis': kurt, 'jb_stat': jb, 'jb_p': float(sps.chi2.sf(jb, 2)) if sps is not None else None,
+            'ks_stat': ks, 'ks_p': float(sps.kstwo.sf(ks, int(n))) if sps is not None and n else None,
+            'ks_resolution': s.resolution}
+
+
+def uniformity_test(acc, column=HOUR_COL, lo=0, hi=23, group=None):
+    """Chi-square of the hour counts against equal counts, plus KS on (x - min) / (max - min)."""
+    s = acc.sketch(column, group)
+    values = np.arange(lo, hi + 1)
+    observed = s.counts.reindex(np.round(values / s.resolution).astype('int64'), fill_value=0).to_numpy()
+    n = int(observed.sum())
+    expected = n / len(values)
+    chi2 = float(((observed - expected) ** 2 / expected).sum()) if n else np.nan
+    m = acc.column_moments(column, group)
+    vmin, vmax = m.min[0], m.max[0]
+    ks = ks_statistic(s, lambda x: np.clip((x - vmin) / (vmax - vmin), 0, 1)) if n and vmax > vmin else np.nan
+    return {'column': column, 'group': group, 'n': n, 'dof': len(values) - 1, 'chi2_stat': chi2,
+            'chi2_p': float(sps.chi2.sf(chi2, len(values) - 1)) if sps is not None and n else None,
+            'ks_stat': ks, 'ks_p': float(sps.kstwo.sf(ks, n)) if sps is not None and n else None,
+            'counts': pd.Series(observed, index=values)}
+
+
+def zscore(df, column, by=BY_COL):
+    """(x - group mean) / group std (ddof=0) without groupby().transform(lambda)."""
+    codes, _ = pd.factorize(df[by].astype(str))
+    if pd.api.types.is_datetime64_any_dtype(df[column]):
+        # seconds since epoch, as in the notebook
+        x = df[column].astype('int64').to_numpy(dtype='float64') / 1e9
+        x[df[column].isna().to_numpy()] = np.nan
+    else:
+        x = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64')
+    m = Moments(int(codes.max()) + 1 if len(codes) else 1).update(x[codes >= 0], codes[codes >= 0])
+    out = np.full(len(x), np.nan)
+    ok = codes >= 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[ok] = (x[ok] - m.mean[codes[ok]]) / m.std(ddof=0)[codes[ok]]
+    return pd.Series(out, index=df.index, name=f'zscore_{column}')
+
+
+# =========================
+# Hotspots (01_final cell 54)
+# =========================
+def _area_codes(df, by=BY_COL):
+    area = df[by]
+    if isinstance(area.dtype, pd.CategoricalDtype):
+        return area.cat.codes.to_numpy().astype('int64'), list(area.cat.categories)
+    codes, uniques = pd.factorize(area.astype(str))
+    return codes.astype('int64'), list(uniques)
+
+
+def hotspot_table(df, top=TOP_AREAS, by=BY_COL):
+    """Incidents per area x hour for the `top` areas with most incidents (most first)."""
+    codes, labels = _area_codes(df, by)
+    hour = hour_values(df).to_numpy(dtype='float64')
+    ok = (codes >= 0) & ~np.isnan(hour)
+    counts = np.bincount(codes[ok] * 24 + hour[ok].astype('int64'), minlength=len(labels) * 24)
+    counts = counts.reshape(len(labels), 24)
+    order = np.argsort(-counts.sum(axis=1), kind='stable')[:top]
+    return pd.DataFrame(counts[order], index=pd.Index([labels[i] for i in order], name=by),
+                        columns=pd.Index(range(24), name='hour'))
+
+
+def hotspot_heatmaps(df, areas=None, top=TOP_AREAS, by=BY_COL):
+    """{area: day x hour counts} for `areas` (default: the `top` areas), from one bincount."""
+    codes, labels = _area_codes(df, by)
+    hour = hour_values(df).to_numpy(dtype='float64')
+    if 'day_of_week' in df.columns:
+        day = pd.to_numeric(df['day_of_week'], errors='coerce').to_numpy(dtype='float64')
+    else:
+        occ = df[DATE_COL] if pd.api.types.is_datetime64_any_dtype(df[DATE_COL]) \
+            else pd.to_datetime(df[DATE_COL], errors='coerce')
+        day = occ.dt.weekday.to_numpy(dtype='float64')
+    ok = (codes >= 0) & ~np.isnan(hour) & ~np.isnan(day)
+    flat = (codes[ok] * 7 + day[ok].astype('int64')) * 24 + hour[ok].astype('int64')
+    counts = np.bincount(flat, minlength=len(labels) * 7 * 24).reshape(len(labels), 7, 24)
+    if areas is None:
+        areas = [labels[i] for i in np.argsort(-counts.sum(axis=(1, 2)), kind='stable')[:top]]
+    pos = {a: i for i, a in enumerate(labels)}
+    return {a: pd.DataFrame(counts[pos[a]], index=pd.Index(DAY_NAMES, name='day'),
+                            columns=pd.Index(range(24), name='hour'))
+            for a in areas if a in pos}
@@ -0,0 +1,113 @@
+# figure_cache.py
+# Bounded LRU cache for rendered callback outputs.
+#
+# Each area always renders the same cards/figures/table for a given dataset,
+# so results are cached under (area, data_version, ...) keys. The frames are
+# loaded once at start, so the cache lives exactly as long as the data it was
+# rendered from: changed source files take effect (with a new data_version)
+# when the app is restarted. The cache is bounded by the serialized (JSON)
+# size of its entries, evicts least recently used entries first and keeps
+# hit/miss/eviction counters for sizing.
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from plotly.io.json import to_json_plotly
+
+from instrumentation import span
+
+DEFAULT_BUDGET_MB = 256
+
+
+def sizeof(value):
+    """Bytes the value takes once serialized for the browser."""
+    try:
+        return len(to_json_plotly(value))
+    except Exception:
+        return 0
+
+
+class FigureCache:
+    def __init__(self, max_bytes=DEFAULT_BUDGET_MB * 1024 * 1024, version=None):
+        self.max_bytes = max_bytes
+        self.version = version
+        self._data = OrderedDict()   # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = self.rejected = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            # only the cache's size measurement; Dash serializes the response after the callback
+            with span('cache.sizeof'):
+                nbytes = sizeof(value)
+        with self._lock:
+            if nbytes > self.max_bytes:
+                self.rejected += 1
+                return value
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+            self._data[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._data:
+                _, (_, old_bytes) = self._data.popitem(last=False)
+                self._bytes -= old_bytes
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else None,
+                'evictions': self.evictions,
+                'rejected': self.rejected,
+            }
+
+
+_MISSING = object()
+
+
+def prewarm(cache, keys_and_computes, workers=1, name="figure-cache-prewarm"):
+    """Fill the cache from a daemon thread (with `workers` threads); returns the thread."""
+    def fill(key, compute):
+        try:
+            cache.get_or_compute(key, compute)
+        except Exception as e:
+            print(f"❌ Fail prewarm {key}: {e}")
+
+    def run():
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=name) as pool:
+            list(pool.map(lambda kc: fill(*kc), keys_and_computes))
+        print(f"✅ Prewarmed figure cache: {cache.stats()}")
+
+    t = threading.Thread(target=run, name=name, daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,201 @@
+# filter_index.py
+# Sorted-position indexes for the dashboard filters.
+#
+# For every filter column the row positions are stored grouped by value
+# (a stable counting sort of the category codes), and the occurrence dates
+# are stored sorted. A filter combination is answered by taking the rows of
+# the most selective filter (a few slices or one searchsorted range) and
+# checking the remaining filters only on those rows, so the cost follows the
+# size of the result instead of the size of df_detail.
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ['area_name', 'crm', 'vict_sex', 'vict_descent', 'vict_age_bin', 'status']
+DATE_COL = 'date_time_occ'
+HOUR_COL = 'hour_occ'
+RESULT_CACHE_SIZE = 128
+
+
+# =========================
+# Result cache
+# =========================
+class ResultCache:
+    """Bounded LRU of computed results. Callers asking for a key that is
+    still being computed wait for that computation instead of repeating it
+    (the per-output callbacks of one filter change run at the same time)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._pending = {}   # key -> Future of the running computation
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            del self._pending[key]
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# =========================
+# Build
+# =========================
+def _postings(codes, n_values):
+    """Row positions grouped by code: rows of code v are order[offsets[v]:offsets[v + 1]]."""
+    codes = np.asarray(codes)
+    order = np.argsort(codes, kind='stable').astype('int32')
+    counts = np.bincount(codes[codes >= 0].astype('int64'), minlength=n_values)
+    # missing codes (-1) sort first; skip them
+    offsets = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+    return {'codes': codes, 'order': order, 'offsets': offsets}
+
+
+def build_filter_index(df, columns=FILTER_COLUMNS, date_col=DATE_COL, hour_col=HOUR_COL):
+    index = {'n': len(df), 'columns': {}, 'date': None, 'results': ResultCache(RESULT_CACHE_SIZE)}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        cat = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype('category')
+        labels = list(cat.cat.categories)
+        index['columns'][col] = {**_postings(cat.cat.codes.to_numpy(), len(labels)),
+                                 'labels': labels, 'lookup': {v: i for i, v in enumerate(labels)}}
+    if hour_col in df.columns:
+        hour = pd.to_numeric(df[hour_col], errors='coerce').fillna(-1).to_numpy().astype('int16')
+        index['columns'][hour_col] = {**_postings(hour, 24), 'labels': list(range(24)),
+                                      'lookup': {h: h for h in range(24)}}
+    if date_col in df.columns:
+        values = df[date_col].to_numpy(dtype='datetime64[ns]')
+        order = np.argsort(values, kind='stable').astype('int32')   # NaT last
+        index['date'] = {'values': values, 'order': order, 'sorted': values[order]}
+    return index
+
+
+def options_for(index, col):
+    """Dropdown options of a filter column."""
+    c = index['columns'].get(col)
+    return [{'label': str(v), 'value': v} for v in c['labels']] if c else []
+
+
+def date_bounds(index):
+    d = index['date']
+    if d is None:
+        return None, None
+    valid = d['sorted'][~np.isnat(d['sorted'])]
+    if not len(valid):
+        return None, None
+    return pd.Timestamp(valid[0]), pd.Timestamp(valid[-1])
+
+
+# =========================
+# Query
+# =========================
+def filter_key(selected_area, start_date=None, end_date=None, hour_range=None, **values):
+    """Hashable, normalized description of a filter combination.
+
+    values: column -> list of selected labels (empty/None = no filter).
+    """
+    cats = tuple(sorted((col, tuple(sorted(map(str, v)))) for col, v in values.items() if v))
+    hours = tuple(hour_range) if hour_range and tuple(hour_range) != (0, 23) else None
+    return (selected_area or None, start_date or None, end_date or None, hours, cats)
+
+
+def is_filtered(key):
+    """True if anything other than the area is filtered."""
+    return any(key[1:4]) or bool(key[4])
+
+
+def _dimensions(index, key):
+    """[(n_rows, positions_fn, mask_fn)] for every active filter of `key`."""
+    area, start, end, hours, cats = key
+    dims = []
+
+    def cat_dim(col, labels):
+        c = index['columns'][col]
+        codes = np.array([c['lookup'][v] for v in labels if v in c['lookup']], dtype='int64')
+        allowed = np.zeros(len(c['labels']) + 1, dtype=bool)   # last slot: missing code
+        allowed[codes] = True
+        size = int((c['offsets'][codes + 1] - c['offsets'][codes]).sum())
+
+        def positions():
+            parts = [c['order'][c['offsets'][v]:c['offsets'][v + 1]] for v in codes]
+            return np.sort(np.concatenate(parts)) if parts else np.array([], dtype='int32')
+
+        def mask(rows):
+            return allowed[c['codes'][rows]]
+        dims.append((size, positions, mask))
+
+    if area is not None and 'area_name' in index['columns']:
+        cat_dim('area_name', [area])
+    for col, labels in cats:
+        c = index['columns'].get(col)
+        if c is not None:
+            cat_dim(col, [v for v in c['labels'] if str(v) in labels])
+    if hours and HOUR_COL in index['columns']:
+        cat_dim(HOUR_COL, list(range(int(hours[0]), int(hours[1]) + 1)))
+    if (start or end) and index['date'] is not None:
+        d = index['date']
+        lo_t = np.datetime64(pd.Timestamp(start), 'ns') if start else None
+        # end_date is inclusive: up to the end of that day
+        hi_t = np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1), 'ns') if end else None
+        lo = np.searchsorted(d['sorted'], lo_t, side='left') if lo_t is not None else 0
+        hi = np.searchsorted(d['sorted'], hi_t, side='left') if hi_t is not None \
+            else int((~np.isnat(d['sorted'])).sum())
+
+        def positions():
+            return np.sort(d['order'][lo:hi])
+
+        def mask(rows):
+            v = d['values'][rows]
+            ok = ~np.isnat(v)
+            if lo_t is not None:
+                ok &= v >= lo_t
+            if hi_t is not None:
+                ok &= v < hi_t
+            return ok
+        dims.append((hi - lo, positions, mask))
+    return dims
+
+
+def select_rows(index, key):
+    """Sorted row positions matching `key` (from filter_key), or None for all rows."""
+    return index['results'].get_or_compute(key, lambda: _select_rows(index, key))
+
+
+def _select_rows(index, key):
+    dims = sorted(_dimensions(index, key), key=lambda d: d[0])
+    if not dims:
+        return None
+    rows = dims[0][1]().astype('int64')
+    for _, _, mask in dims[1:]:
+        if not len(rows):
+            break
+        rows = rows[mask(rows)]
+    return rows
@@ -0,0 +1,181 @@
+# imputation.py
+# Categorical imputation for Vict Sex / Vict Descent / Premis Desc.
+#
+# The notebook ran sklearn's IterativeImputer on the category codes of every
+# column and rounded the regression output back to a code, which is neither a
+# categorical model nor cheap on the full table. GroupModeImputer instead
+# predicts the most frequent value among records that share the same
+# predictors, backing off to coarser groups (and finally the global mode)
+# when a group is unseen or too small. Counts are additive, so the model can
+# be fitted on a sample or chunk by chunk, and applied chunk by chunk.
+import os
+import time
+import pickle
+
+import numpy as np
+import pandas as pd
+
+# target -> predictor groups, most specific first; () is the global mode
+DEFAULT_LEVELS = {
+    'Vict Sex': [('Crm Cd Desc', 'AREA NAME', 'Premis Desc'), ('Crm Cd Desc', 'Premis Desc'),
+                 ('Crm Cd Desc',), ()],
+    'Vict Descent': [('AREA NAME', 'Rpt Dist No'), ('AREA NAME', 'Crm Cd Desc'), ('AREA NAME',), ()],
+    'Premis Desc': [('Crm Cd Desc', 'AREA NAME'), ('Crm Cd Desc',), ()],
+}
+IMPUTER_VERSION = 1
+MIN_SUPPORT = 5
+SAMPLE_ROWS = 500_000
+CHUNK_SIZE = 250_000
+
+
+class GroupModeImputer:
+    """Back-off group-mode model: fit/partial_fit on counts, transform in chunks."""
+
+    def __init__(self, levels=None, min_support=MIN_SUPPORT):
+        self.levels = levels or DEFAULT_LEVELS
+        self.min_support = min_support
+        self.counts = {}   # (target, keys) -> Series of counts indexed by keys + target
+        self.tables = None
+        self.stats = {}
+
+    # ---- fit ----
+    def partial_fit(self, df):
+        t0 = time.perf_counter()
+        for target, levels in self.levels.items():
+            if target not in df.columns:
+                continue
+            for keys in levels:
+                keys = tuple(k for k in keys if k in df.columns) if keys else ()
+                cols = list(keys) + [target]
+                c = df[cols].dropna().groupby(cols, sort=False, observed=True).size()
+                prev = self.counts.get((target, keys))
+                self.counts[(target, keys)] = c if prev is None else prev.add(c, fill_value=0)
+        self.tables = None
+        self._add_stat('fit', len(df), time.perf_counter() - t0)
+        return self
+
+    def merge(self, other):
+        """Add the counts of another model (e.g. fitted on another partition)."""
+        for key, c in other.counts.items():
+            prev = self.counts.get(key)
+            self.counts[key] = c if prev is None else prev.add(c, fill_value=0)
+        self.tables = None
+        return self
+
+    def fit(self, df, sample=SAMPLE_ROWS, random_state=42):
+        if sample and len(df) > sample:
+            df = df.sample(sample, random_state=random_state)
+        return self.partial_fit(df)
+
+    def _build_tables(self):
+        """Per level: most frequent target value per key group (with its support)."""
+        self.tables = {}
+        for (target, keys), c in self.counts.items():
+            if c.empty:
+                continue
+            # ties go to the smallest value, whatever order the counts were added in
+            c = c.sort_index().sort_values(ascending=False, kind='stable')
+            if keys:
+                key_idx = c.index.droplevel(-1)
+                first = ~key_idx.duplicated()
+                support = c.groupby(level=list(range(len(keys))), sort=False).sum()
+                best = pd.DataFrame({'value': c.index.get_level_values(-1)[first]}, index=key_idx[first])
+                best['support'] = support.reindex(best.index).to_numpy()
+                best = best[best['support'] >= self.min_support]
+            else:
+                best = pd.DataFrame({'value': [c.index[0]], 'support': [c.sum()]})
+            self.tables[(target, keys)] = best
+
+    # ---- transform ----
+    def _fill(self, df):
+        df = df.copy()
+        for target, levels in self.levels.items():
+            if target not in df.columns:
+                continue
+            missing = df[target].isna().to_numpy()
+            if not missing.any():
+                continue
+            filled = df[target].to_numpy(dtype=object).copy()
+            for keys in levels:
+                keys = tuple(k for k in keys if k in df.columns) if keys else ()
+                table = self.tables.get((target, keys))
+                if table is None or table.empty:
+                    continue
+                rows = np.flatnonzero(missing)
+                if keys:
+                    sub = df.iloc[rows][list(keys)]
+                    if len(keys) == 1:
+                        pos = table.index.get_indexer(sub[keys[0]])
+                    else:
+                        pos = table.index.get_indexer(pd.MultiIndex.from_frame(sub))
+                else:
+                    pos = np.zeros(len(rows), dtype='int64')
+                hit = pos >= 0
+                filled[rows[hit]] = table['value'].to_numpy()[pos[hit]]
+                missing[rows[hit]] = False
+                if not missing.any():
+                    break
+            df[target] = filled
+        return df
+
+    def transform(self, df, chunk_size=CHUNK_SIZE):
+        if self.tables is None:
+            self._build_tables()
+        t0 = time.perf_counter()
+        out = pd.concat([self._fill(df.iloc[i:i + chunk_size]) for i in range(0, len(df), chunk_size)]) \
+            if len(df) else df.copy()
+        self._add_stat('transform', len(df), time.perf_counter() - t0)
+        return out
+
+    def transform_chunks(self, chunks):
+        """Streaming version: yields imputed chunks."""
+        for chunk in chunks:
+            yield self.transform(chunk)
+
+    # ---- throughput ----
+    def _add_stat(self, stage, rows, seconds):
+        s = self.stats.setdefault(stage, {'rows': 0, 'seconds': 0.0})
+        s['rows'] += rows
+        s['seconds'] += seconds
+
+    def throughput(self):
+        """{stage: rows/s} for fit and transform so far."""
+        return {k: (v['rows'] / v['seconds'] if v['seconds'] else float('nan')) for k, v in self.stats.items()}
+
+
+# =========================
+# Persist (counts only; the tables are rebuilt from them)
+# =========================
+def save_imputer(model, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    state = {'version': IMPUTER_VERSION, 'levels': model.levels, 'min_support': model.min_support,
+             'counts': model.counts}
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_imputer(path):
+    """Return the persisted model, or None if missing/stale."""
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except Exception:
+        return None
+    if state.get('version') != IMPUTER_VERSION:
+        return None
+    model = GroupModeImputer(state['levels'], state['min_support'])
+    model.counts = state['counts']
+    return model
+
+
+def impute_grouped(df, sample=SAMPLE_ROWS, report=True):
+    """Drop-in for the notebook's IterativeImputer step (raw column names)."""
+    model = GroupModeImputer().fit(df, sample=sample)
+    out = model.transform(df)
+    if report:
+        tp = model.throughput()
+        print(f"✅ Imputed {len(df)} rows (fit {tp.get('fit', float('nan')):,.0f} rows/s, "
+              f"transform {tp.get('transform', float('nan')):,.0f} rows/s)")
+    return out
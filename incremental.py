@@ -0,0 +1,291 @@
+# incremental.py
+# Incremental ingestion of monthly LAPD extracts.
+#
+# The monthly "Crime Data from 2020 to Present" file is cumulative, so a full
+# re-clean repeats hours of work on records that did not change. Here every
+# raw row is hashed and compared (by DR_NO) with what the store already holds;
+# only new or changed records go through cleaning.clean_raw and are appended
+# as new Parquet files under partitions/year_occ=<Y>/area_name=<A>/. Existing
+# partition files are never rewritten: a changed record gets a new version
+# in the current batch and dr_index.parquet points at the latest one.
+#
+# Like the age-bin edges in the manifest, the imputation model is kept in
+# the store (imputer.pkl): its counts grow with every batch, so a small
+# monthly increment is imputed with the model of the whole history.
+#
+# The area cube, the daily trend rollup, the per area/year crime counts and
+# Police_Crime.csv (the source of df_summary / crimes_per_police) are updated
+# from the delta only.
+#
+#   python incremental.py Crime_Data_from_2020_to_Present_20251106.csv --store data/store
+import os
+import re
+import json
+import glob
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+
+from cleaning import clean_raw
+from imputation import GroupModeImputer, load_imputer, save_imputer
+from preprocess import prepare_detail, ensure_area_name
+from staffing import load_rosters, asof_staffing
+from area_cube import build_area_cube, apply_delta, save_area_cube, load_area_cube, source_signature
+from trend_store import build_rollup, load_rollup, save_rollup, apply_delta as apply_trend_delta
+
+STORE_VERSION = 1
+KEY = 'dr_no'
+BATCH_COL = '_batch'
+
+DEFAULT_POLICE_COUNTS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     'data', 'processed', 'Police_Counts_by_Area.csv')
+
+
+# =========================
+# Store layout
+# =========================
+def store_paths(store_dir):
+    return {
+        'manifest': os.path.join(store_dir, 'manifest.json'),
+        'index': os.path.join(store_dir, 'dr_index.parquet'),
+        'partitions': os.path.join(store_dir, 'partitions'),
+        'cube': os.path.join(store_dir, 'area_cube.pkl'),
+        'trend': os.path.join(store_dir, 'trend_rollup.pkl'),
+        'imputer': os.path.join(store_dir, 'imputer.pkl'),
+        'counts': os.path.join(store_dir, 'crime_counts.csv'),
+        'police_crime': os.path.join(store_dir, 'Police_Crime.csv'),
+    }
+
+
+def read_manifest(store_dir):
+    try:
+        with open(store_paths(store_dir)['manifest']) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'version': STORE_VERSION, 'batches': [], 'age_edges': None}
+
+
+def _write_json(path, obj):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(obj, f, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def read_index(store_dir):
+    path = store_paths(store_dir)['index']
+    if not os.path.exists(path):
+        return pd.DataFrame({KEY: pd.Series(dtype='int64'), 'row_hash': pd.Series(dtype='uint64'),
+                             BATCH_COL: pd.Series(dtype='int32'), 'stored': pd.Series(dtype=bool)})
+    return pd.read_parquet(path)
+
+
+def _partition_value(v):
+    return re.sub(r'[^\w.-]+', '_', str(v)) if pd.notna(v) else 'unknown'
+
+
+def _current_keys(index):
+    """dr_no/batch keys of the live version of every stored record."""
+    live = index[index['stored']]
+    return (live[KEY].to_numpy(dtype='int64') << 20) | live[BATCH_COL].to_numpy(dtype='int64')
+
+
+def read_store(store_dir, columns=None, filter=None):
+    """Live (latest-version) rows of the store as one DataFrame.
+
+    `filter` is an optional pyarrow.dataset expression (e.g. on year_occ or
+    area_name) pushed down to the partition files.
+    """
+    files = sorted(glob.glob(os.path.join(store_paths(store_dir)['partitions'], '**', '*.parquet'), recursive=True))
+    if not files:
+        return pd.DataFrame()
+    # later batches may have all-null columns; promote them to the common type
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options='permissive')
+    dataset = ds.dataset(files, schema=schema, format='parquet')
+    read_cols = None
+    if columns is not None:
+        read_cols = list(dict.fromkeys([c for c in columns if c in dataset.schema.names] + [KEY, BATCH_COL]))
+    df = dataset.to_table(columns=read_cols, filter=filter).to_pandas()
+    keys = (df[KEY].to_numpy(dtype='int64') << 20) | df[BATCH_COL].to_numpy(dtype='int64')
+    df = df[np.isin(keys, _current_keys(read_index(store_dir)))]
+    drop = [c for c in [BATCH_COL] + ([KEY] if columns is not None and KEY not in columns else []) if c in df.columns]
+    return df.drop(columns=drop).reset_index(drop=True)
+
+
+def _write_partitions(clean, store_dir, batch_id):
+    """One new file per (year_occ, area_name); returns the written paths."""
+    written = []
+    schema = pa.Schema.from_pandas(clean, preserve_index=False)
+    year = pd.to_datetime(clean['date_time_occ'], errors='coerce').dt.year
+    for (y, area), part in clean.groupby([year.fillna(-1).astype(int), clean['area_name']], sort=True):
+        d = os.path.join(store_paths(store_dir)['partitions'],
+                         f"year_occ={y if y >= 0 else 'unknown'}", f"area_name={_partition_value(area)}")
+        os.makedirs(d, exist_ok=True)
+        path = os.path.join(d, f"batch-{batch_id:06d}.parquet")
+        pq.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False), path)
+        written.append(path)
+    return written
+
+
+# =========================
+# Aggregates
+# =========================
+def _area_year_counts(clean):
+    if clean.empty:
+        return pd.DataFrame(columns=['area_name', 'year_occ', 'total_crimes'])
+    year = pd.to_datetime(clean['date_time_occ'], errors='coerce').dt.year
+    return (clean.assign(year_occ=year)
+            .groupby(['area_name', 'year_occ']).size().reset_index(name='total_crimes'))
+
+
+def update_counts(store_dir, added, removed):
+    """crime_counts.csv += counts(added) - counts(removed)."""
+    path = store_paths(store_dir)['counts']
+    counts = pd.read_csv(path) if os.path.exists(path) else _area_year_counts(added.iloc[0:0])
+    delta = pd.concat([_area_year_counts(added),
+                       _area_year_counts(removed).assign(total_crimes=lambda d: -d['total_crimes'])])
+    counts = (pd.concat([counts, delta])
+              .groupby(['area_name', 'year_occ'], as_index=False)['total_crimes'].sum())
+    counts = counts[counts['total_crimes'] > 0]
+    counts.to_csv(path, index=False)
+    return counts
+
+
+def write_police_crime(store_dir, counts, police_counts_path=DEFAULT_POLICE_COUNTS):
+    """Police_Crime.csv (same columns as data/processed/Police_Crime.csv), one row per
+    area/year with the nearest roster snapshot."""
+    out = asof_staffing(ensure_area_name(counts), load_rosters(police_counts_path))
+    out.to_csv(store_paths(store_dir)['police_crime'], index=False)
+    return out
+
+
+def update_cube(store_dir, added, removed):
+    """Apply the delta to the store's area cube and stamp it with the manifest."""
+    paths = store_paths(store_dir)
+    add_cube = build_area_cube(prepare_detail(added, report=False))
+    rm_cube = build_area_cube(prepare_detail(removed, report=False)) if not removed.empty else None
+    cube = load_area_cube(paths['cube'])
+    cube = apply_delta(cube, add_cube, rm_cube) if cube is not None else add_cube
+    cube['signature'] = source_signature([paths['manifest']])
+    save_area_cube(cube, paths['cube'])
+    return cube
+
+
+def update_trend(store_dir, added, removed):
+    """Apply the delta to the store's daily trend rollup."""
+    paths = store_paths(store_dir)
+    rollup = load_rollup(paths['trend'])
+    # same area_name normalization as the dashboard's df_detail
+    added = prepare_detail(added, report=False)
+    removed = prepare_detail(removed, report=False) if not removed.empty else removed
+    rollup = apply_trend_delta(rollup, added, removed) if rollup is not None else build_rollup(added)
+    rollup['signature'] = source_signature([paths['manifest']])
+    save_rollup(rollup, paths['trend'])
+    return rollup
+
+
+# =========================
+# Ingest
+# =========================
+def read_raw(path):
+    return pd.read_csv(path, sep=',', encoding='latin-1')
+
+
+def row_hashes(raw):
+    """Hash of every raw row, with numeric columns hashed as float64.
+
+    read_csv picks a column's dtype per file, e.g. `Premis Cd` is float64
+    while it has a NaN and int64 once it has none; the same record must
+    hash the same in every extract.
+    """
+    numeric = raw.select_dtypes('number').columns
+    return pd.util.hash_pandas_object(raw.astype({c: 'float64' for c in numeric}), index=False).to_numpy()
+
+
+def ingest(raw, store_dir, police_counts_path=DEFAULT_POLICE_COUNTS, clean=clean_raw):
+    """Clean and append the new/changed records of `raw` (path or DataFrame)."""
+    source = raw if isinstance(raw, str) else '<dataframe>'
+    if isinstance(raw, str):
+        raw = read_raw(raw)
+    paths = store_paths(store_dir)
+    os.makedirs(paths['partitions'], exist_ok=True)
+    manifest = read_manifest(store_dir)
+    index = read_index(store_dir)
+
+    raw = raw.drop_duplicates(subset='DR_NO', keep='last').reset_index(drop=True)
+    row_hash = row_hashes(raw)
+    dr = raw['DR_NO'].to_numpy(dtype='int64')
+
+    pos = pd.Index(index[KEY].to_numpy()).get_indexer(dr)
+    is_new = pos < 0
+    prev_hash = index['row_hash'].to_numpy()[pos.clip(0)] if len(index) else row_hash
+    is_changed = ~is_new & (prev_hash != row_hash)
+    todo = is_new | is_changed
+    summary = {'source': source, 'rows': len(raw), 'new': int(is_new.sum()), 'changed': int(is_changed.sum())}
+    if not todo.any():
+        print(f"✅ Nothing to ingest from {source} ({len(raw)} rows already stored)")
+        return summary
+
+    batch_id = max([b['id'] for b in manifest['batches']], default=0) + 1
+    imputer = load_imputer(paths['imputer']) or GroupModeImputer()
+    new_dr = dr[is_new]
+
+    def impute(df):
+        # add this batch's counts (changed records were counted with their first version)
+        imputer.fit(df[df['DR_NO'].isin(new_dr)])
+        return imputer.transform(df)
+    cleaned, age_edges = clean(raw[todo], age_edges=manifest.get('age_edges'), impute=impute)
+    cleaned = cleaned.copy()
+    cleaned[BATCH_COL] = np.int32(batch_id)
+
+    # previous versions of changed records, read (not modified) from their partitions
+    changed_dr = dr[is_changed]
+    removed = pd.DataFrame()
+    if len(changed_dr):
+        live = index[index['stored'] & index[KEY].isin(changed_dr)]
+        if not live.empty:
+            removed = read_store(store_dir, filter=ds.field(KEY).isin(live[KEY].tolist()))
+
+    written = _write_partitions(cleaned, store_dir, batch_id)
+
+    new_index = pd.DataFrame({KEY: dr[todo], 'row_hash': row_hash[todo],
+                              BATCH_COL: np.int32(batch_id),
+                              'stored': np.isin(dr[todo], cleaned[KEY].to_numpy(dtype='int64'))})
+    index = pd.concat([index[~index[KEY].isin(new_index[KEY])], new_index], ignore_index=True)
+    index.to_parquet(paths['index'], index=False)
+
+    manifest['age_edges'] = [float(e) for e in age_edges]
+    manifest['batches'].append({'id': batch_id, 'source': source, 'created': datetime.now().isoformat(timespec='seconds'),
+                                'new': summary['new'], 'changed': summary['changed'],
+                                'stored': int(len(cleaned)), 'files': len(written)})
+    _write_json(paths['manifest'], manifest)
+    save_imputer(imputer, paths['imputer'])
+
+    cleaned = cleaned.drop(columns=[BATCH_COL])
+    counts = update_counts(store_dir, cleaned, removed)
+    write_police_crime(store_dir, counts, police_counts_path)
+    update_cube(store_dir, cleaned, removed)
+    update_trend(store_dir, cleaned, removed)
+
+    summary.update({'batch': batch_id, 'stored': int(len(cleaned)), 'files': len(written)})
+    print(f"✅ Ingested batch {batch_id} from {source}: {summary['new']} new, "
+          f"{summary['changed']} changed, {len(cleaned)} stored in {len(written)} files")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append new/changed LAPD records to the partitioned store.")
+    parser.add_argument('raw', help="raw Crime_Data_from_2020_to_Present_*.csv")
+    parser.add_argument('--store', default=os.path.join('data', 'store'))
+    parser.add_argument('--police-counts', default=DEFAULT_POLICE_COUNTS)
+    args = parser.parse_args()
+    ingest(args.raw, args.store, args.police_counts)
+
+
+if __name__ == '__main__':
+    main()
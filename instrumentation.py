@@ -0,0 +1,235 @@
+# instrumentation.py
+# Timing spans for the load stages and the callbacks of the dashboard.
+#
+# span('name') times a block. Spans opened while a request_span() is running
+# (one per callback run) are nested under it, e.g. heatmap/build/aggregate,
+# and kept with the request as one trace. When tracing is off (the default)
+# both return a shared no-op context, so instrumented code pays one
+# attribute check per block.
+#
+# Each finished request adds its latency to a rolling window per
+# (output, area); /metrics reports percentiles over those windows, totals
+# per span path and the recent slow traces. In profile mode a sampling
+# thread records the Python stack of every running request every few ms,
+# and requests slower than slow_ms are written as folded stacks
+# (one "frame;frame;frame count" line per stack), the input format of
+# flamegraph.pl and speedscope.
+import os
+import re
+import sys
+import time
+import threading
+from collections import Counter, deque, defaultdict
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+LATENCY_WINDOW = 512       # latest requests kept per (output, area)
+SLOW_MS = 500.0
+SAMPLE_INTERVAL_S = 0.005
+RECENT_SLOW = 50
+PERCENTILES = [50, 90, 95, 99]
+
+_NULL = nullcontext()
+
+
+# =========================
+# Sampling profiler
+# =========================
+class StackSampler:
+    """Samples the stacks of registered threads from a daemon thread."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self._active = {}   # thread id -> Counter(folded stack -> samples)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, tid):
+        with self._lock:
+            self._active[tid] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def stop(self, tid):
+        with self._lock:
+            return self._active.pop(tid, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                tids = list(self._active)
+            if not tids:
+                continue
+            frames = sys._current_frames()
+            for tid in tids:
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                folded = ';'.join(reversed(stack))
+                with self._lock:
+                    if tid in self._active:
+                        self._active[tid][folded] += 1
+
+
+# =========================
+# Tracer
+# =========================
+class Tracer:
+    def __init__(self, enabled=False, profile=False, slow_ms=SLOW_MS, profile_dir=None,
+                 window=LATENCY_WINDOW):
+        self.enabled = enabled
+        self.profile = profile
+        self.slow_ms = slow_ms
+        self.profile_dir = profile_dir
+        self.window = window
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._latency = defaultdict(lambda: deque(maxlen=self.window))   # (output, area) -> ms
+        self._spans = {}   # span path -> [count, total ms, max ms]
+        self._slow = deque(maxlen=RECENT_SLOW)
+        self._sampler = StackSampler()
+
+    def configure(self, enabled=None, profile=None, slow_ms=None, profile_dir=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if profile is not None:
+            self.profile = profile
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if profile_dir is not None:
+            self.profile_dir = profile_dir
+        return self
+
+    def reset(self):
+        with self._lock:
+            self._latency.clear()
+            self._spans.clear()
+            self._slow.clear()
+
+    # ---- spans ----
+    def span(self, name):
+        if not self.enabled:
+            return _NULL
+        return self._span(name)
+
+    def request_span(self, output, area=None):
+        """Root span of one callback run; its latency is tracked per (output, area)."""
+        if not self.enabled:
+            return _NULL
+        if getattr(self._local, 'request', None) is not None:
+            return self._span(output)   # nested callbacks count as a section of the outer one
+        return self._request(output, area)
+
+    @contextmanager
+    def _span(self, name):
+        path = getattr(self._local, 'path', None)
+        if path is None:
+            path = self._local.path = []
+        path.append(name)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            key = '/'.join(path)
+            path.pop()
+            request = getattr(self._local, 'request', None)
+            if request is not None:
+                request['spans'].append((key, ms))
+            else:
+                with self._lock:
+                    self._add_span(key, ms)
+
+    @contextmanager
+    def _request(self, output, area):
+        tid = threading.get_ident()
+        request = self._local.request = {'output': output, 'area': area, 'spans': []}
+        profile = self.profile
+        if profile:
+            self._sampler.start(tid)
+        started = time.time()
+        try:
+            with self._span(output):
+                yield
+        finally:
+            self._local.request = None
+            stacks = self._sampler.stop(tid) if profile else None
+            key, ms = request['spans'][-1]   # the root closes last
+            with self._lock:
+                self._latency[(output, area)].append(ms)
+                for path, span_ms in request['spans']:
+                    self._add_span(path, span_ms)
+                if ms >= self.slow_ms:
+                    trace = {'output': output, 'area': area, 'start': started, 'ms': round(ms, 3),
+                             'spans': [{'path': p, 'ms': round(s, 3)} for p, s in request['spans']]}
+                    if stacks:
+                        trace['profile'] = self._dump_profile(stacks, output, area, started)
+                    self._slow.append(trace)
+
+    def _add_span(self, path, ms):
+        s = self._spans.get(path)
+        if s is None:
+            self._spans[path] = [1, ms, ms]
+        else:
+            s[0] += 1
+            s[1] += ms
+            s[2] = max(s[2], ms)
+
+    def _dump_profile(self, stacks, output, area, started):
+        """Write folded stacks of one slow request; returns the file path (None on failure)."""
+        if not self.profile_dir:
+            return None
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}"
+                      f"-{int(started * 1000) % 1000:03d}-{output}-{area}")
+        path = os.path.join(self.profile_dir, name + '.folded')
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            with open(path, 'w') as f:
+                for stack, n in stacks.most_common():
+                    f.write(f"{stack} {n}\n")
+            return path
+        except Exception as e:
+            print(f"❌ Fail write profile {path}: {e}")
+            return None
+
+    # ---- report ----
+    @staticmethod
+    def _percentiles(values):
+        v = np.fromiter(values, dtype='float64')
+        out = {'n': int(len(v))}
+        if len(v):
+            out.update({f'p{p}': round(float(x), 3) for p, x in zip(PERCENTILES, np.percentile(v, PERCENTILES))})
+            out['max'] = round(float(v.max()), 3)
+        return out
+
+    def metrics(self):
+        with self._lock:
+            latency = {k: list(v) for k, v in self._latency.items()}
+            spans = {k: list(v) for k, v in self._spans.items()}
+            slow = list(self._slow)
+        by_output, by_area = defaultdict(dict), defaultdict(list)
+        for (output, area), values in latency.items():
+            by_output[output][str(area)] = self._percentiles(values)
+            by_area[str(area)].extend(values)
+        return {
+            'enabled': self.enabled, 'profile': self.profile, 'slow_ms': self.slow_ms,
+            'latency_ms': dict(by_output),
+            'latency_ms_by_area': {a: self._percentiles(v) for a, v in by_area.items()},
+            'spans_ms': {p: {'count': c, 'total': round(t, 3), 'mean': round(t / c, 3), 'max': round(m, 3)}
+                         for p, (c, t, m) in sorted(spans.items())},
+            'slow': slow,
+        }
+
+
+# process-wide tracer, configured by the app at start
+tracer = Tracer()
+span = tracer.span
+request_span = tracer.request_span
@@ -0,0 +1,226 @@
+# map_bins.py
+# Server-side level-of-detail binning for the map-chart.
+#
+# Instead of shipping every incident of an area to px.density_mapbox, points
+# are binned once into a square lat/lon grid per zoom level (a pyramid). The
+# map callback only sends the cells of the level matching the current zoom,
+# clipped to the viewport, so the figure payload is bounded by MAX_CELLS
+# whatever the number of incidents. The pyramid is persisted next to the
+# area cube, so a warm start only unpickles it.
+import os
+import math
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from area_cube import source_signature
+
+PYRAMID_VERSION = 1
+ZOOM_LEVELS = list(range(8, 17))
+# grid cells per 256px map tile edge (=> ~8px cells on screen)
+CELLS_PER_TILE = 32
+MAX_CELLS = 5000
+
+
+def cell_size(zoom):
+    """Cell edge in degrees for a zoom level."""
+    return 360.0 / (2 ** zoom) / CELLS_PER_TILE
+
+
+def valid_coords(lat, lon):
+    """Mask out NaN and the (0, 0) placeholder LAPD uses for unknown locations."""
+    lat = np.asarray(lat, dtype='float64')
+    lon = np.asarray(lon, dtype='float64')
+    return ~np.isnan(lat) & ~np.isnan(lon) & (lat != 0) & (lon != 0)
+
+
+# =========================
+# Build
+# =========================
+def _levels_from_finest(finest):
+    """{zoom: DataFrame(ix, iy, count)} by shifting finest cell indices."""
+    top = max(ZOOM_LEVELS)
+    # int32 halves the persisted pyramid (cell indices at zoom 16 stay below 2**22)
+    finest = finest.astype({'ix': 'int32', 'iy': 'int32', 'count': 'int32'})
+    levels = {top: finest.reset_index(drop=True)}
+    for z in sorted(ZOOM_LEVELS, reverse=True)[1:]:
+        shift = top - z
+        lvl = pd.DataFrame({'ix': finest['ix'].to_numpy() >> shift,
+                            'iy': finest['iy'].to_numpy() >> shift,
+                            'count': finest['count'].to_numpy()})
+        levels[z] = lvl.groupby(['ix', 'iy'], sort=False)['count'].sum().reset_index()
+    return levels
+
+
+def point_cells(lat, lon):
+    """Finest-level cell of every point: {'ix', 'iy', 'ok'}, where `ok` masks
+    out invalid coordinates (their ix/iy are 0)."""
+    lat = pd.to_numeric(pd.Series(lat), errors='coerce').to_numpy(dtype='float64')
+    lon = pd.to_numeric(pd.Series(lon), errors='coerce').to_numpy(dtype='float64')
+    ok = valid_coords(lat, lon)
+    cs = cell_size(max(ZOOM_LEVELS))
+    return {'ix': np.where(ok, np.floor(lon / cs), 0).astype('int32'),
+            'iy': np.where(ok, np.floor(lat / cs), 0).astype('int32'),
+            'ok': ok}
+
+
+def build_map_pyramid(df, lat_col='lat', lon_col='lon', area_col='area_name'):
+    """Bin df's coordinates into {'areas': {area: levels}, 'all': levels}."""
+    pyramid = {'version': PYRAMID_VERSION, 'areas': {}, 'all': None}
+    if df.empty or lat_col not in df.columns or lon_col not in df.columns:
+        return pyramid
+
+    points = point_cells(df[lat_col], df[lon_col])
+    ok = points['ok']
+    cells = pd.DataFrame({
+        'area': df[area_col].to_numpy()[ok] if area_col in df.columns else 'all',
+        'ix': points['ix'][ok],
+        'iy': points['iy'][ok],
+    })
+    finest = cells.groupby(['area', 'ix', 'iy'], sort=False, observed=True).size().reset_index(name='count')
+
+    for area, part in finest.groupby('area', sort=False, observed=True):
+        pyramid['areas'][area] = _levels_from_finest(part[['ix', 'iy', 'count']])
+    all_cells = finest.groupby(['ix', 'iy'], sort=False)['count'].sum().reset_index()
+    pyramid['all'] = _levels_from_finest(all_cells)
+    return pyramid
+
+
+def _bin_points(ix, iy):
+    """DataFrame(ix, iy, count) of the distinct cells of the points (ix, iy)."""
+    code = (ix.astype('int64') << 32) | (iy.astype('int64') + 2 ** 31)
+    cells, counts = np.unique(code, return_counts=True)
+    return pd.DataFrame({'ix': (cells >> 32).astype('int32'),
+                         'iy': ((cells & 0xffffffff) - 2 ** 31).astype('int32'),
+                         'count': counts.astype('int32')})
+
+
+def levels_for_rows(points, rows):
+    """Levels (as in the pyramid, no area split) of the points at positions
+    `rows`, binned straight from their finest cells (see point_cells)."""
+    rows = np.asarray(rows, dtype='int64')
+    rows = rows[points['ok'][rows]]
+    ix, iy = points['ix'][rows], points['iy'][rows]
+    top = max(ZOOM_LEVELS)
+    return {z: _bin_points(ix >> (top - z), iy >> (top - z)) for z in ZOOM_LEVELS}
+
+
+# =========================
+# Persist
+# =========================
+def save_map_pyramid(pyramid, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(pyramid, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_map_pyramid(path, signature=None):
+    """Return the persisted pyramid, or None if missing/stale."""
+    try:
+        with open(path, 'rb') as f:
+            pyramid = pickle.load(f)
+    except Exception:
+        return None
+    if pyramid.get('version') != PYRAMID_VERSION:
+        return None
+    if signature is not None and pyramid.get('signature') != signature:
+        return None
+    return pyramid
+
+
+def load_or_build_map_pyramid(df, path, source_paths=(), lat_col='lat', lon_col='lon'):
+    signature = source_signature(source_paths)
+    if signature:
+        # the same source can be binned from lat/lon or latitude/longitude
+        signature += ((lat_col, lon_col),)
+    pyramid = load_map_pyramid(path, signature) if signature else None
+    if pyramid is not None:
+        print(f"✅ Loaded map pyramid {path} ({len(pyramid['areas'])} areas)")
+        return pyramid
+    pyramid = build_map_pyramid(df, lat_col, lon_col)
+    pyramid['signature'] = signature
+    if signature:
+        try:
+            save_map_pyramid(pyramid, path)
+            print(f"✅ Saved map pyramid {path} ({len(pyramid['areas'])} areas)")
+        except Exception as e:
+            print(f"❌ Fail save map pyramid {path}: {e}")
+    return pyramid
+
+
+# =========================
+# Query
+# =========================
+def viewport_from_relayout(relayout):
+    """(zoom, (lon_min, lat_min, lon_max, lat_max)) from map relayoutData."""
+    if not relayout:
+        return None, None
+    zoom = relayout.get('mapbox.zoom')
+    bounds = None
+    derived = relayout.get('mapbox._derived') or {}
+    coords = derived.get('coordinates')
+    if coords:
+        lons = [c[0] for c in coords]
+        lats = [c[1] for c in coords]
+        bounds = (min(lons), min(lats), max(lons), max(lats))
+    return zoom, bounds
+
+
+def pick_level(zoom):
+    """Pyramid level for a map zoom (clamped to ZOOM_LEVELS)."""
+    if zoom is None:
+        return None
+    return int(min(max(math.floor(zoom), min(ZOOM_LEVELS)), max(ZOOM_LEVELS)))
+
+
+def query_cells(levels, zoom=None, bounds=None, max_cells=MAX_CELLS):
+    """Cells (lat, lon, count) for a view; coarsens until <= max_cells.
+
+    Without a zoom the finest level that fits in max_cells is used.
+    """
+    empty = pd.DataFrame({'lat': [], 'lon': [], 'count': []})
+    if not levels:
+        return empty, None
+    z = pick_level(zoom)
+    candidates = sorted([l for l in levels if z is None or l <= z], reverse=True) or [min(levels)]
+    for level in candidates:
+        cells = levels[level]
+        cs = cell_size(level)
+        lon_c = (cells['ix'].to_numpy() + 0.5) * cs
+        lat_c = (cells['iy'].to_numpy() + 0.5) * cs
+        if bounds is not None:
+            lon_min, lat_min, lon_max, lat_max = bounds
+            keep = (lon_c >= lon_min - cs) & (lon_c <= lon_max + cs) & \
+                   (lat_c >= lat_min - cs) & (lat_c <= lat_max + cs)
+            lon_c, lat_c = lon_c[keep], lat_c[keep]
+            counts = cells['count'].to_numpy()[keep]
+        else:
+            counts = cells['count'].to_numpy()
+        if len(counts) <= max_cells or level == candidates[-1]:
+            if len(counts) > max_cells:
+                # coarsest level still too big: keep the densest cells
+                top = np.argsort(counts)[-max_cells:]
+                lon_c, lat_c, counts = lon_c[top], lat_c[top], counts[top]
+            return pd.DataFrame({'lat': lat_c, 'lon': lon_c, 'count': counts}), level
+    return empty, None
+
+
+def total_points(levels):
+    if not levels:
+        return 0
+    return int(levels[min(levels)]['count'].sum())
+
+
+def center_of(levels):
+    """Count-weighted centre (lat, lon) of an area's points."""
+    if not levels:
+        return None
+    level = max(levels)
+    cells = levels[level]
+    w = cells['count'].to_numpy()
+    cs = cell_size(level)
+    return (float(np.average((cells['iy'].to_numpy() + 0.5) * cs, weights=w)),
+            float(np.average((cells['ix'].to_numpy() + 0.5) * cs, weights=w)))
@@ -0,0 +1,209 @@
+# parallel_clean.py
+# Multi-process version of stream_clean for the raw LAPD extract.
+#
+# The raw CSV is split into byte ranges aligned on line starts (the extract
+# has no line breaks inside quoted fields). Every range is cleaned by a
+# worker process in the same two passes as stream_clean:
+#
+#   1. row stages (dates, district, weapon/premis, vict_age anomalies) per
+#      chunk, spilled to Parquet parts, plus partial imputer counts and a
+#      vict_age sketch per range
+#   2. with the merged imputer and the global age edges: impute, rename and
+#      bin the parts of the range into one CSV piece
+#
+# Counts and sketches are merged, and the CSV pieces concatenated, in range
+# order, so the output is identical to stream_clean whatever the number of
+# workers. Both fit the imputer on every row; cleaning.clean_raw fits it on a
+# sample of imputation.SAMPLE_ROWS rows, so it only gives the same output for
+# extracts up to that size. The district polygons are loaded once per worker (and
+# shared copy-on-write where processes are forked); the merged imputer and
+# age edges are sent once per worker through the pool initializer.
+#
+#   python parallel_clean.py Crime_Data_from_2020_to_Present_20251006.csv -o Crime_Data_Clean.csv -j 32
+import io
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from cleaning import rename_normalize, add_age_bin
+from districts import load_districts, DEFAULT_GEOJSON
+from imputation import GroupModeImputer
+from sketch import QuantileSketch
+from stream_clean import row_stages, map_stage, peak_rss_mb, CHUNK_SIZE, RAW_ENCODING, AGE_ANOMALY_POLICY
+
+
+# =========================
+# Byte ranges
+# =========================
+def byte_ranges(path, n):
+    """(header bytes, [(start, end), ...]) with every range starting at a line start."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        body_start = f.tell()
+        cuts = [body_start]
+        for i in range(1, n):
+            f.seek(max(body_start + (size - body_start) * i // n, cuts[-1]))
+            f.readline()   # move to the next line start
+            cuts.append(min(f.tell(), size))
+    cuts.append(size)
+    ranges = [(a, b) for a, b in zip(cuts[:-1], cuts[1:]) if b > a]
+    return header, ranges
+
+
+class _RangeReader(io.RawIOBase):
+    """File-like view of `header` followed by bytes [start, end) of `path`."""
+
+    def __init__(self, path, start, end, header):
+        self._f = open(path, 'rb')
+        self._f.seek(start)
+        self._left = end - start
+        self._header = header
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._header:
+            n = min(len(b), len(self._header))
+            b[:n], self._header = self._header[:n], self._header[n:]
+            return n
+        n = min(len(b), self._left)
+        data = self._f.read(n)
+        b[:len(data)] = data
+        self._left -= len(data)
+        return len(data)
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+def read_range_chunks(path, start, end, header, chunksize=CHUNK_SIZE):
+    with io.BufferedReader(_RangeReader(path, start, end, header)) as f:
+        yield from pd.read_csv(f, sep=',', encoding=RAW_ENCODING, chunksize=chunksize)
+
+
+# =========================
+# Workers
+# =========================
+_worker = {}
+
+
+def _init_worker(geojson, imputer=None, age_edges=None):
+    load_districts(geojson)   # parse/prepare the polygons once per process
+    _worker.update({'imputer': imputer, 'age_edges': age_edges})
+
+
+def _first_pass(task):
+    """Row stages of one range -> (parts, imputer counts, sketch, rows in)."""
+    idx, path, start, end, header, chunksize, spill_dir, age_policy, geojson = task
+    imputer = GroupModeImputer()
+    sketch = QuantileSketch(resolution=1)
+    rows_in = [0]
+
+    def count(chunk):
+        rows_in[0] += len(chunk)
+        return chunk
+
+    parts = []
+    chunks = row_stages(map_stage(count, read_range_chunks(path, start, end, header, chunksize)), age_policy,
+                        geojson)
+    for i, chunk in enumerate(chunks):
+        imputer.partial_fit(chunk)
+        sketch.update(chunk['Vict Age'])
+        part = os.path.join(spill_dir, f"r{idx:05d}-part-{i:06d}.parquet")
+        chunk.to_parquet(part, index=False)
+        parts.append(part)
+    return parts, imputer, sketch, rows_in[0]
+
+
+def _second_pass(task):
+    """Impute/rename/bin the parts of one range into a header-less CSV piece."""
+    idx, parts, out_dir = task
+    imputer, age_edges = _worker['imputer'], _worker['age_edges']
+    piece = os.path.join(out_dir, f"r{idx:05d}.csv")
+    columns, rows = None, 0
+    with open(piece, 'w', newline='', encoding='utf-8') as f:
+        for part in parts:
+            chunk = add_age_bin(rename_normalize(imputer.transform(pd.read_parquet(part))), age_edges)
+            chunk.to_csv(f, index=False, header=False)
+            columns = list(chunk.columns)
+            rows += len(chunk)
+            os.remove(part)
+    return piece, columns, rows
+
+
+# =========================
+# Driver
+# =========================
+def clean_file_parallel(path, out_path, workers=None, chunksize=CHUNK_SIZE, age_edges=None,
+                        age_policy=AGE_ANOMALY_POLICY, spill_dir=None, ranges_per_worker=1,
+                        geojson=DEFAULT_GEOJSON):
+    """Clean `path` into the CSV `out_path` with `workers` processes; returns stats."""
+    workers = workers or os.cpu_count() or 1
+    header, ranges = byte_ranges(path, workers * ranges_per_worker)
+    stats = {'workers': workers, 'ranges': len(ranges)}
+    load_districts(geojson)   # forked workers inherit the parsed polygons
+
+    tmp = tempfile.mkdtemp(dir=spill_dir, prefix='parallel-clean-')
+    try:
+        t0 = time.perf_counter()
+        tasks = [(i, path, a, b, header, chunksize, tmp, age_policy, geojson) for i, (a, b) in enumerate(ranges)]
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(geojson,)) as pool:
+            first = list(pool.map(_first_pass, tasks))
+
+        # merge in range order so ties and edges do not depend on scheduling
+        imputer, sketch = GroupModeImputer(), QuantileSketch(resolution=1)
+        for _, part_imputer, part_sketch, _ in first:
+            imputer.merge(part_imputer)
+            sketch.merge(part_sketch)
+        if age_edges is None:
+            age_edges = list(sketch.quantile([0, 0.25, 0.5, 0.75, 1.0]))
+        stats.update({'rows_in': sum(r[3] for r in first), 'age_edges': age_edges,
+                      'first_pass_s': time.perf_counter() - t0})
+
+        t0 = time.perf_counter()
+        tasks = [(i, r[0], tmp) for i, r in enumerate(first)]
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(geojson, imputer, age_edges)) as pool:
+            pieces = list(pool.map(_second_pass, tasks))
+
+        columns = next((c for _, c, _ in pieces if c), None)
+        tmp_out = out_path + '.tmp'
+        with open(tmp_out, 'wb') as out:
+            if columns:
+                out.write((','.join(columns) + '\n').encode('utf-8'))
+            for piece, _, _ in pieces:
+                with open(piece, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+        os.replace(tmp_out, out_path)
+        stats.update({'rows': sum(r for _, _, r in pieces), 'second_pass_s': time.perf_counter() - t0})
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    stats['peak_rss_mb'] = peak_rss_mb()
+    print(f"✅ Cleaned {path} -> {out_path}: {stats['rows']} rows, {len(ranges)} ranges on {workers} workers "
+          f"({stats['first_pass_s'] + stats['second_pass_s']:.1f} s)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean a raw LAPD extract with several processes.")
+    parser.add_argument('raw', help="raw Crime_Data_from_2020_to_Present_*.csv")
+    parser.add_argument('-o', '--out', default='Crime_Data_Clean.csv')
+    parser.add_argument('-j', '--workers', type=int, default=None, help="default: number of cores")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--age-policy', choices=['keep', 'nan', 'drop'], default=AGE_ANOMALY_POLICY)
+    parser.add_argument('--spill-dir', default=None, help="directory for the temporary Parquet parts")
+    args = parser.parse_args()
+    clean_file_parallel(args.raw, args.out, args.workers, args.chunksize, age_policy=args.age_policy,
+                        spill_dir=args.spill_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# preprocess.py
+# Normalization helpers shared by the dashboard and the ingestion tools
+# (column names, area_name, date parsing, derived time fields, compact dtypes).
+import pandas as pd
+
+from schema import compact_frame, DETAIL_SCHEMA
+
+# =========================
+# NORMALIZE COLUMN NAMES
+# =========================
+def normalize_cols(df):
+    df = df.copy()
+    df.columns = [c.strip() for c in df.columns]
+    # map original -> normalized
+    new_names = {orig: orig.strip().lower().replace(' ', '_').replace('-', '_') for orig in df.columns}
+    df = df.rename(columns=new_names)
+    return df
+
+# =========================
+# Ensure area_name exists & clean
+# =========================
+def ensure_area_name(df):
+    df = df.copy()
+    if 'area_name' not in df.columns:
+        candidates = [c for c in df.columns if 'area' in c]
+        if candidates:
+            df['area_name'] = df[candidates[0]]
+        else:
+            df['area_name'] = "Unknown"
+    df['area_name'] = df['area_name'].astype(str).str.title().str.strip()
+    return df
+
+# =========================
+# PARSE DATES (robust)
+# =========================
+def try_parse_dates(df, cols):
+    df = df.copy()
+    for c in cols:
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors='coerce', infer_datetime_format=True)
+    return df
+
+# =========================
+# PREPARE (normalize + parse) per dataset
+# =========================
+def prepare_agg(df):
+    if df.empty:
+        return df
+    df = normalize_cols(df)
+    df = ensure_area_name(df)
+    return try_parse_dates(df, ['date'])
+
+def prepare_detail(df, report=True):
+    if df.empty:
+        return df
+    df = normalize_cols(df)
+    df = ensure_area_name(df)
+    df = try_parse_dates(df, ['date_time_occ', 'date_rptd', 'date_rptd_time', 'date_occ'])
+
+    # derive useful time fields in detail
+    if 'date_time_occ' in df.columns:
+        df['hour_occ'] = df['date_time_occ'].dt.hour
+        df['day_name'] = df['date_time_occ'].dt.day_name()
+        df['day_of_week'] = df['date_time_occ'].dt.weekday  # Mon=0
+        df['year_occ'] = df['date_time_occ'].dt.year
+
+    # Ensure lat/lon numeric
+    for coord in ['lat', 'lon', 'latitude', 'longitude']:
+        if coord in df.columns:
+            df[coord] = pd.to_numeric(df[coord], errors='coerce')
+
+    # compact dtypes (categoricals, int8/int16 time fields, float32 coords)
+    return compact_frame(df, DETAIL_SCHEMA, report=report)
@@ -0,0 +1,103 @@
+# schema.py
+# Compact dtype schema for df_detail.
+#
+# Every Dash/gunicorn worker holds its own copy of the detail table, so the
+# object-dtype strings and 64-bit numbers are what limit the worker count.
+# apply_schema() dictionary-encodes the text columns, narrows the time fields
+# and stores coordinates as float32.
+import numpy as np
+import pandas as pd
+
+# column -> target dtype ('category', 'int8', 'int16', 'float32')
+DETAIL_SCHEMA = {
+    'area_name': 'category',
+    'crm': 'category',
+    'premis': 'category',
+    'premis_desc': 'category',
+    'status': 'category',
+    'vict_sex': 'category',
+    'vict_descent': 'category',
+    'vict_age_bin': 'category',
+    'weapon': 'category',
+    'location': 'category',
+    'cross_street': 'category',
+    'day_name': 'category',
+    'hour_occ': 'int8',
+    'day_of_week': 'int8',
+    'part_1_2': 'int8',
+    'district': 'int8',
+    'year_occ': 'int16',
+    'vict_age': 'int16',
+    'rpt_dist_no': 'int16',
+    'lat': 'float32',
+    'lon': 'float32',
+    'latitude': 'float32',
+    'longitude': 'float32',
+}
+
+# LAPD publishes coordinates with 4 decimals
+FLOAT32_DECIMALS = 4
+
+
+def _to_int(s, dtype):
+    """Narrow to `dtype`; columns with missing values fall back to float32."""
+    s = pd.to_numeric(s, errors='coerce')
+    if s.isna().any():
+        return s.astype(np.float32)
+    info = np.iinfo(dtype)
+    if len(s) and (s.min() < info.min or s.max() > info.max):
+        return pd.to_numeric(s, downcast='integer')
+    return s.astype(dtype)
+
+
+def apply_schema(df, schema=DETAIL_SCHEMA):
+    """Cast the columns of `df` that appear in `schema`; others are left alone."""
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if dtype == 'category':
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                df[col] = s.astype('category')
+        elif dtype == 'float32':
+            df[col] = pd.to_numeric(s, errors='coerce').astype(np.float32)
+        else:
+            df[col] = _to_int(s, dtype)
+    return df
+
+
+def memory_report(before, after):
+    """Per-column deep memory (MB) of two versions of the same frame."""
+    rep = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'mb_before': before.memory_usage(deep=True, index=False) / 1e6,
+        'dtype_after': after.dtypes.astype(str),
+        'mb_after': after.memory_usage(deep=True, index=False) / 1e6,
+    })
+    rep.loc['TOTAL', ['mb_before', 'mb_after']] = [rep['mb_before'].sum(), rep['mb_after'].sum()]
+    rep['ratio'] = rep['mb_before'] / rep['mb_after']
+    return rep.round(3)
+
+
+def compact_frame(df, schema=DETAIL_SCHEMA, report=True):
+    """apply_schema() and optionally print the before/after memory report."""
+    if df.empty:
+        return df
+    out = apply_schema(df, schema)
+    if report:
+        rep = memory_report(df, out)
+        print(rep.to_string())
+        print(f"✅ Compacted -> {rep.loc['TOTAL', 'mb_after']:.1f} MB "
+              f"({rep.loc['TOTAL', 'ratio']:.1f}x smaller)")
+    return out
+
+
+def to_display(df, decimals=FLOAT32_DECIMALS):
+    """Widen float32 columns back to rounded float64 for JSON/table output."""
+    f32 = [c for c in df.columns if df[c].dtype == np.float32]
+    if not f32:
+        return df
+    df = df.copy()
+    df[f32] = df[f32].astype('float64').round(decimals)
+    return df
@@ -0,0 +1,58 @@
+# sketch.py
+# Mergeable quantile sketch for streaming passes over large files.
+#
+# Values are snapped to a grid of `resolution` and counted per grid cell,
+# so memory is bounded by the number of distinct cells (for vict_age about
+# 130), sketches of different chunks/processes can be added together, and a
+# quantile is off by at most resolution / 2 from the exact value. With
+# integer data and resolution=1 the result equals Series.quantile().
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    def __init__(self, resolution=1.0):
+        self.resolution = float(resolution)
+        self.counts = pd.Series(dtype='int64')   # grid cell -> count
+        self.n = 0
+
+    def update(self, values):
+        v = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+        v = v[~np.isnan(v)]
+        if not len(v):
+            return self
+        cells, counts = np.unique(np.round(v / self.resolution).astype('int64'), return_counts=True)
+        return self.add_cells(cells, counts)
+
+    def add_cells(self, cells, counts):
+        """Add pre-counted grid cells (value / resolution, rounded)."""
+        self.counts = self.counts.add(pd.Series(counts, index=cells), fill_value=0).astype('int64')
+        self.n += int(np.sum(counts))
+        return self
+
+    def merge(self, other):
+        if other.resolution != self.resolution:
+            raise ValueError("cannot merge sketches with different resolutions")
+        self.counts = self.counts.add(other.counts, fill_value=0).astype('int64')
+        self.n += other.n
+        return self
+
+    def quantile(self, q):
+        """Linear-interpolated quantile(s), like Series.quantile()."""
+        qs = np.atleast_1d(np.asarray(q, dtype='float64'))
+        if self.n == 0:
+            out = np.full(len(qs), np.nan)
+            return out if np.ndim(q) else float(out[0])
+        counts = self.counts.sort_index()
+        values = counts.index.to_numpy(dtype='float64') * self.resolution
+        ends = np.cumsum(counts.to_numpy())
+        pos = qs * (self.n - 1)
+        lo, hi = np.floor(pos).astype('int64'), np.ceil(pos).astype('int64')
+        v_lo = values[np.searchsorted(ends, lo, side='right')]
+        v_hi = values[np.searchsorted(ends, hi, side='right')]
+        out = v_lo + (v_hi - v_lo) * (pos - lo)
+        return out if np.ndim(q) else float(out[0])
+
+    def error_bound(self):
+        """Maximum distance between a returned quantile and the exact one."""
+        return self.resolution / 2
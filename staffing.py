@@ -0,0 +1,81 @@
+# staffing.py
+# Crime counts per area and period joined with the police roster in force.
+#
+# Police_Crime.csv used to merge the yearly crime counts with every roster
+# snapshot of the area (a many-to-many join), so each area/year appeared
+# once per roster date. Here every (area, period) is matched with the single
+# nearest roster snapshot of that area (pd.merge_asof), which gives one row
+# per area and period with the ratio computed column-wise.
+import os
+
+import numpy as np
+import pandas as pd
+
+from preprocess import ensure_area_name
+
+STAFFING_COLS = ['area_name', 'year_occ', 'total_crimes', 'date', 'police_count', 'crimes_per_police']
+ROSTER_RENAME = {'AREA': 'area_name', 'count': 'police_count', 'SDATE': 'date'}
+
+
+# =========================
+# Inputs
+# =========================
+def load_rosters(path):
+    """Police_Counts_by_Area.csv -> (area_name, date, police_count)."""
+    if not path or not os.path.exists(path):
+        return pd.DataFrame(columns=['area_name', 'date', 'police_count'])
+    return clean_rosters(pd.read_csv(path).rename(columns=ROSTER_RENAME))
+
+
+def clean_rosters(rosters):
+    """Normalized area names, parsed dates, one row per (area, date)."""
+    if rosters.empty:
+        return pd.DataFrame(columns=['area_name', 'date', 'police_count'])
+    out = ensure_area_name(rosters)[['area_name', 'date', 'police_count']].copy()
+    out['date'] = pd.to_datetime(out['date'], errors='coerce')
+    out['police_count'] = pd.to_numeric(out['police_count'], errors='coerce')
+    out = out.dropna().drop_duplicates(['area_name', 'date'], keep='last')
+    return out.astype({'police_count': 'int64'}).sort_values('date', kind='stable').reset_index(drop=True)
+
+
+def yearly_counts(daily):
+    """(area_name, year_occ, total_crimes) from daily counts (day, area_name, count)."""
+    if daily.empty:
+        return pd.DataFrame(columns=['area_name', 'year_occ', 'total_crimes'])
+    return (pd.DataFrame({'area_name': daily['area_name'].astype(str),
+                          'year_occ': pd.to_datetime(daily['day']).dt.year,
+                          'count': daily['count']})
+            .groupby(['area_name', 'year_occ'], as_index=False)['count'].sum()
+            .rename(columns={'count': 'total_crimes'}))
+
+
+# =========================
+# As-of join
+# =========================
+def asof_staffing(counts, rosters):
+    """One row per (area, year): the roster snapshot nearest to mid-year."""
+    if counts.empty or rosters.empty:
+        return pd.DataFrame(columns=STAFFING_COLS)
+    left = counts.copy()
+    left['area_name'] = left['area_name'].astype(str)
+    left['_ref'] = pd.to_datetime(left['year_occ'].astype(int).astype(str) + '-07-01')
+    right = rosters.astype({'area_name': str}).rename(columns={'date': '_roster'})
+    out = pd.merge_asof(left.sort_values('_ref', kind='stable'), right.sort_values('_roster', kind='stable'),
+                        left_on='_ref', right_on='_roster', by='area_name', direction='nearest')
+    out = out.dropna(subset=['_roster']).rename(columns={'_roster': 'date'})
+    out['police_count'] = out['police_count'].astype('int64')
+    out['crimes_per_police'] = np.where(out['police_count'] > 0,
+                                        out['total_crimes'] / out['police_count'].where(out['police_count'] > 0),
+                                        np.nan)
+    return out[STAFFING_COLS].sort_values(['area_name', 'year_occ'], kind='stable').reset_index(drop=True)
+
+
+def area_summary(staffing):
+    """Per area: crimes over all years, latest roster count and mean yearly crimes per police."""
+    cols = ['area_name', 'total_crimes', 'police_count', 'crimes_per_police']
+    if staffing.empty:
+        return pd.DataFrame(columns=cols)
+    g = staffing.sort_values('date', kind='stable').groupby('area_name', sort=True)
+    return pd.DataFrame({'total_crimes': g['total_crimes'].sum(),
+                         'police_count': g['police_count'].last(),
+                         'crimes_per_police': g['crimes_per_police'].mean()}).reset_index()[cols]
@@ -0,0 +1,150 @@
+# stream_clean.py
+# Chunked version of cleaning.clean_raw for raw extracts that do not fit in
+# memory.
+#
+# The raw CSV is read in chunks and every cleaning step is a generator stage
+# over those chunks, so at most one chunk (plus its copies inside a step) is
+# in memory at a time. Two things need the whole file: the imputation model
+# and the vict_age quartile edges. Both are accumulated in a first pass
+# (GroupModeImputer.partial_fit and a QuantileSketch) while the row-level
+# steps, including district assignment, are run once and spilled to Parquet
+# parts; the second pass reads the parts back, imputes, renames and bins.
+# The imputer is fitted on every row; clean_raw fits it on a sample of
+# imputation.SAMPLE_ROWS rows, so the two agree only up to that size.
+#
+#   python stream_clean.py Crime_Data_from_2020_to_Present_20251006.csv -o Crime_Data_Clean.csv
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import pandas as pd
+
+from cleaning import merge_date_time, add_district, fix_weapon_premis, rename_normalize, add_age_bin
+from districts import DEFAULT_GEOJSON
+from imputation import GroupModeImputer
+from sketch import QuantileSketch
+
+CHUNK_SIZE = 200_000
+RAW_ENCODING = 'latin-1'
+
+# vict_age values treated as anomalies: 0 and below (no person / unknown)
+# and 120 and above (placeholder). 'keep' leaves them as they are, which is
+# what 00_prototype.ipynb decided; 'nan' blanks them; 'drop' removes the rows.
+AGE_ANOMALY_MIN = 0
+AGE_ANOMALY_MAX = 120
+AGE_ANOMALY_POLICY = 'keep'
+
+
+# =========================
+# Stages (chunks in, chunks out)
+# =========================
+def read_chunks(path, chunksize=CHUNK_SIZE):
+    yield from pd.read_csv(path, sep=',', encoding=RAW_ENCODING, chunksize=chunksize)
+
+
+def map_stage(fn, chunks):
+    for chunk in chunks:
+        yield fn(chunk)
+
+
+def handle_age_anomalies(df, policy=AGE_ANOMALY_POLICY):
+    """Apply the anomaly policy; Vict Age always leaves as nullable Int16, so
+    every chunk is written the same way whatever the policy and chunking."""
+    df = df.copy()
+    age = pd.to_numeric(df['Vict Age'], errors='coerce').round().astype('Int16')
+    anomaly = ((age <= AGE_ANOMALY_MIN) | (age >= AGE_ANOMALY_MAX)).fillna(False).to_numpy(dtype=bool)
+    if policy == 'nan':
+        age = age.mask(anomaly)
+    df['Vict Age'] = age
+    if policy == 'drop':
+        return df[~anomaly]
+    return df
+
+
+def row_stages(chunks, age_policy=AGE_ANOMALY_POLICY, geojson=DEFAULT_GEOJSON):
+    """Row-level steps of clean_raw, in the same order."""
+    chunks = map_stage(merge_date_time, chunks)
+    chunks = map_stage(lambda c: add_district(c, geojson), chunks)
+    chunks = map_stage(fix_weapon_premis, chunks)
+    return map_stage(lambda c: handle_age_anomalies(c, age_policy), chunks)
+
+
+# =========================
+# Two-pass flow
+# =========================
+def first_pass(chunks, spill_dir, imputer, sketch):
+    """Run the row stages, fit imputer + age sketch, spill parts; returns part paths."""
+    parts = []
+    for i, chunk in enumerate(chunks):
+        imputer.partial_fit(chunk)
+        sketch.update(chunk['Vict Age'])
+        path = os.path.join(spill_dir, f"part-{i:06d}.parquet")
+        chunk.to_parquet(path, index=False)
+        parts.append(path)
+    return parts
+
+
+def iter_clean(path, chunksize=CHUNK_SIZE, age_edges=None, age_policy=AGE_ANOMALY_POLICY,
+               spill_dir=None, stats=None, geojson=DEFAULT_GEOJSON):
+    """Yield clean chunks of the raw extract at `path` (columns as clean_raw)."""
+    stats = {} if stats is None else stats
+    imputer = GroupModeImputer()
+    sketch = QuantileSketch(resolution=1)
+    with tempfile.TemporaryDirectory(dir=spill_dir, prefix='stream-clean-') as tmp:
+        t0 = time.perf_counter()
+        parts = first_pass(row_stages(read_chunks(path, chunksize), age_policy, geojson), tmp, imputer, sketch)
+        if age_edges is None:
+            age_edges = list(sketch.quantile([0, 0.25, 0.5, 0.75, 1.0]))
+        stats.update({'parts': len(parts), 'age_edges': age_edges, 'first_pass_s': time.perf_counter() - t0})
+
+        t0 = time.perf_counter()
+        rows = 0
+        for part in parts:
+            chunk = rename_normalize(imputer.transform(pd.read_parquet(part)))
+            chunk = add_age_bin(chunk, age_edges)
+            rows += len(chunk)
+            yield chunk
+            os.remove(part)
+        stats.update({'rows': rows, 'second_pass_s': time.perf_counter() - t0})
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def clean_file(path, out_path, chunksize=CHUNK_SIZE, age_edges=None, age_policy=AGE_ANOMALY_POLICY,
+               spill_dir=None):
+    """Stream `path` through the cleaning stages into the CSV `out_path`."""
+    stats = {}
+    tmp_out = out_path + '.tmp'
+    with open(tmp_out, 'w', newline='', encoding='utf-8') as f:
+        for i, chunk in enumerate(iter_clean(path, chunksize, age_edges, age_policy, spill_dir, stats)):
+            chunk.to_csv(f, index=False, header=(i == 0))
+    os.replace(tmp_out, out_path)
+    stats['peak_rss_mb'] = peak_rss_mb()
+    print(f"✅ Cleaned {path} -> {out_path}: {stats['rows']} rows in {stats['parts']} chunks "
+          f"({stats['first_pass_s'] + stats['second_pass_s']:.1f} s, peak RSS {stats['peak_rss_mb'] or 0:.0f} MB)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean a raw LAPD extract chunk by chunk.")
+    parser.add_argument('raw', help="raw Crime_Data_from_2020_to_Present_*.csv")
+    parser.add_argument('-o', '--out', default='Crime_Data_Clean.csv')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--age-policy', choices=['keep', 'nan', 'drop'], default=AGE_ANOMALY_POLICY)
+    parser.add_argument('--spill-dir', default=None, help="directory for the temporary Parquet parts")
+    args = parser.parse_args()
+    clean_file(args.raw, args.out, args.chunksize, age_policy=args.age_policy, spill_dir=args.spill_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+# table_query.py
+# Server-side filter / sort / paging for the data-table.
+#
+# The table used to receive the first 200 rows of an area and filter/sort
+# them in the browser. Here the DataTable filter_query and sort_by are run on
+# the server over the whole detail table: categorical columns are matched on
+# their (small) category list and then looked up by code, numeric and date
+# columns are compared as plain arrays, and sorting uses per-column ranks that
+# are computed once. The selected row positions of a query are cached, so
+# paging through a result only gathers page_size rows.
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# DataTable operator (with or without the i/s case prefix) -> canonical name
+OPERATORS = {
+    '=': 'eq', 'eq': 'eq', '!=': 'ne', 'ne': 'ne',
+    '<': 'lt', 'lt': 'lt', '<=': 'le', 'le': 'le',
+    '>': 'gt', 'gt': 'gt', '>=': 'ge', 'ge': 'ge',
+    'contains': 'contains', 'datestartswith': 'datestartswith',
+}
+CLAUSE_RE = re.compile(r'^\{(?P<col>[^}]+)\}\s+(?P<op>is\s+not\s+\w+|is\s+\w+|[is]?[<>!=]=?|[a-z]+)\s*(?P<val>.*)$')
+# an unquoted value containing these is a second clause the parser does not support (e.g. `||`)
+UNSUPPORTED_VALUE_RE = re.compile(r'\|\||&&|\{')
+RESULT_CACHE_SIZE = 64
+# selections larger than n / this use the presorted order for single-key sorts
+PRESORTED_MIN_SHARE = 16
+
+
+# =========================
+# Index
+# =========================
+def build_table_index(df, columns):
+    """Per-column arrays used by run_query (no copy of categorical data)."""
+    index = {'n': len(df), 'columns': {}, 'lock': threading.Lock(), 'results': OrderedDict()}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            index['columns'][col] = {'kind': 'cat', 'codes': s.cat.codes.to_numpy(),
+                                     'labels': s.cat.categories.astype(str)}
+        elif pd.api.types.is_datetime64_any_dtype(s):
+            index['columns'][col] = {'kind': 'date', 'values': s.to_numpy(dtype='datetime64[ns]')}
+        elif pd.api.types.is_numeric_dtype(s):
+            index['columns'][col] = {'kind': 'num', 'values': s.to_numpy(dtype='float64')}
+        else:
+            # leftover object columns are dictionary-encoded once
+            cat = pd.Categorical(s.astype('string'))
+            index['columns'][col] = {'kind': 'cat', 'codes': cat.codes, 'labels': cat.categories.astype(str)}
+    return index
+
+
+def _rank(index, col):
+    """Dense sort rank of every row of `col` (equal values share a rank, nulls
+    get the highest), built lazily on the first sort by `col`."""
+    c = index['columns'][col]
+    if 'rank' in c:
+        return c['rank']
+    with index['lock']:
+        if 'rank' not in c:
+            if c['kind'] == 'cat':
+                # categories are not necessarily sorted: rank them by label
+                label_rank = np.empty(len(c['labels']) + 1, dtype='int32')
+                label_rank[:-1] = np.argsort(np.argsort(np.asarray(c['labels'], dtype=object), kind='stable'))
+                label_rank[-1] = len(c['labels'])
+                rank = label_rank[c['codes'].astype('int64')]   # code -1 -> last slot
+                c['null_rank'] = len(c['labels'])
+            else:
+                values = c['values']
+                null = pd.isna(values)
+                # equal values must tie so the later sort keys decide between them
+                uniq, inverse = np.unique(values[~null], return_inverse=True)
+                rank = np.full(len(values), len(uniq), dtype='int32')
+                rank[~null] = inverse
+                c['null_rank'] = len(uniq)
+            c['rank'] = rank
+    return c['rank']
+
+
+def _sort_key(index, col, rows, desc=False):
+    """Ranks of `rows` for one sort key. Descending flips the non-null ranks
+    only, so nulls stay last in both directions."""
+    rank = _rank(index, col)[rows]
+    if desc:
+        top = index['columns'][col]['null_rank']
+        rank = np.where(rank == top, top, top - 1 - rank)
+    return rank
+
+
+def _order(index, col, desc=False):
+    """All rows sorted by `col` alone (ties in row order), built lazily."""
+    c = index['columns'][col]
+    name = 'order_desc' if desc else 'order'
+    if name not in c:
+        key = _sort_key(index, col, slice(None), desc)
+        with index['lock']:
+            if name not in c:
+                c[name] = np.argsort(key, kind='stable')
+    return c[name]
+
+
+# =========================
+# Filter expressions
+# =========================
+def _unquote(val):
+    val = val.strip()
+    if len(val) >= 2 and val[0] == val[-1] and val[0] in '"\'`':
+        return val[1:-1]
+    return val
+
+
+def parse_filter_query(filter_query):
+    """DataTable filter_query -> [(col, op, value, case_insensitive)].
+
+    Only `&&`-joined clauses are supported (what the table UI produces);
+    anything else raises ValueError instead of being dropped, so a query is
+    never silently run without one of its clauses.
+    """
+    clauses = []
+    for part in (filter_query or '').split(' && '):
+        if not part.strip():
+            continue
+        m = CLAUSE_RE.match(part.strip())
+        if not m:
+            raise ValueError(f"unsupported filter clause: {part.strip()!r}")
+        op = re.sub(r'\s+', ' ', m.group('op'))
+        if op.startswith('is '):
+            clauses.append((m.group('col'), op, None, False))
+            continue
+        insensitive = op[0] == 'i' and op[1:] in OPERATORS
+        if op[0] in 'is' and op[1:] in OPERATORS:
+            op = op[1:]
+        val = m.group('val').strip()
+        if op not in OPERATORS or (val == _unquote(val) and UNSUPPORTED_VALUE_RE.search(val)):
+            raise ValueError(f"unsupported filter clause: {part.strip()!r}")
+        clauses.append((m.group('col'), OPERATORS[op], _unquote(val), insensitive))
+    return clauses
+
+
+def _compare(values, op, value):
+    if op == 'eq':
+        return values == value
+    if op == 'ne':
+        return values != value
+    if op == 'lt':
+        return values < value
+    if op == 'le':
+        return values <= value
+    if op == 'gt':
+        return values > value
+    return values >= value
+
+
+def _date_range(text):
+    """'2021', '2021-03' or '2021-03-05...' -> [start, end) for datestartswith."""
+    text = text.strip()
+    start = pd.Timestamp(text)
+    if re.fullmatch(r'\d{4}', text):
+        return start, start + pd.DateOffset(years=1)
+    if re.fullmatch(r'\d{4}-\d{1,2}', text):
+        return start, start + pd.DateOffset(months=1)
+    if re.fullmatch(r'\d{4}-\d{1,2}-\d{1,2}', text):
+        return start, start + pd.DateOffset(days=1)
+    return start, start + pd.Timedelta(minutes=1)
+
+
+def _label_hits(labels, op, value, insensitive):
+    """Boolean per category label (+ trailing False for missing codes)."""
+    lab = pd.Series(labels)
+    if insensitive:
+        lab, value = lab.str.lower(), value.lower()
+    if op == 'contains':
+        hit = lab.str.contains(value, regex=False).to_numpy()
+    elif op == 'datestartswith':
+        hit = lab.str.startswith(value).to_numpy()
+    else:
+        num = pd.to_numeric(value, errors='coerce')
+        lab_num = pd.to_numeric(lab, errors='coerce')
+        if not pd.isna(num) and lab_num.notna().all():
+            hit = _compare(lab_num.to_numpy(), op, num)
+        else:
+            hit = _compare(lab.to_numpy(dtype=object), op, value).astype(bool)
+    return np.append(hit, False)
+
+
+def _clause_mask(c, rows, op, value, insensitive):
+    """Mask over `rows` for one clause on column index entry `c`."""
+    if op in ('is blank', 'is nil', 'is not blank', 'is not nil'):
+        if c['kind'] == 'cat':
+            blank = c['codes'][rows] < 0
+        else:
+            blank = pd.isna(c['values'][rows])
+        return ~blank if 'not' in op else blank
+    if c['kind'] == 'cat':
+        hits = _label_hits(c['labels'], op, value, insensitive)
+        return hits[c['codes'][rows].astype('int64')]
+    values = c['values'][rows]
+    if c['kind'] == 'date':
+        try:
+            if op in ('datestartswith', 'contains'):
+                start, end = _date_range(value)
+                return (values >= start.to_datetime64()) & (values < end.to_datetime64())
+            return _compare(values, op, pd.Timestamp(value).to_datetime64())
+        except (ValueError, TypeError):
+            return np.zeros(len(rows), dtype=bool)
+    num = pd.to_numeric(value, errors='coerce')
+    if op == 'contains':
+        # numeric "contains" as the table does it: on the displayed text
+        return pd.Series(values).astype(str).str.contains(str(value), regex=False).to_numpy()
+    if pd.isna(num):
+        return np.zeros(len(rows), dtype=bool)
+    return _compare(values, op, num)
+
+
+# =========================
+# Query
+# =========================
+def _select(index, rows, clauses, sort_by):
+    rows = np.arange(index['n']) if rows is None else np.asarray(rows, dtype='int64')
+    for col, op, value, insensitive in clauses:
+        c = index['columns'].get(col)
+        if c is None or not len(rows):
+            continue
+        rows = rows[_clause_mask(c, rows, op, value, insensitive)]
+
+    sort_by = [s for s in (sort_by or []) if s.get('column_id') in index['columns']]
+    if len(sort_by) == 1 and len(rows) > index['n'] // PRESORTED_MIN_SHARE:
+        # large selection, one key: walk the presorted order instead of sorting
+        keep = np.zeros(index['n'], dtype=bool)
+        keep[rows] = True
+        order = _order(index, sort_by[0]['column_id'], sort_by[0].get('direction') == 'desc')
+        return order[keep[order]]
+    if sort_by and len(rows):
+        # np.lexsort: last key is the primary one; the row position breaks ties
+        # the same way as the presorted order
+        keys = [rows] + [_sort_key(index, s['column_id'], rows, s.get('direction') == 'desc')
+                         for s in reversed(sort_by)]
+        rows = rows[np.lexsort(keys)]
+    return rows
+
+
+def run_query(index, rows, filter_query, sort_by, cache_key=None):
+    """Row positions matching filter_query, ordered by sort_by.
+
+    `rows` restricts the query to a subset (e.g. one area); `cache_key`
+    identifies that subset so later pages of the same query are a lookup.
+    Without a cache_key the result is not cached.
+    """
+    clauses = parse_filter_query(filter_query)
+    if cache_key is None:
+        return _select(index, rows, clauses, sort_by)
+    key = (cache_key, tuple(clauses), tuple((s.get('column_id'), s.get('direction')) for s in (sort_by or [])))
+    with index['lock']:
+        hit = index['results'].get(key)
+        if hit is not None:
+            index['results'].move_to_end(key)
+            return hit
+    out = _select(index, rows, clauses, sort_by)
+    with index['lock']:
+        index['results'][key] = out
+        while len(index['results']) > RESULT_CACHE_SIZE:
+            index['results'].popitem(last=False)
+    return out
+
+
+def page_rows(selected, page_current, page_size):
+    """Positions of one page and the page count."""
+    page_current = page_current or 0
+    start = page_current * page_size
+    page_count = max(1, -(-len(selected) // page_size))
+    return selected[start:start + page_size], page_count
@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from filter_index import ResultCache, build_filter_index, filter_key, select_rows
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = ResultCache(maxsize=4)
+    calls = []
+    start = threading.Barrier(5)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'entry'
+
+    def caller(out):
+        start.wait()
+        out.append(cache.get_or_compute('key', compute))
+
+    out = []
+    threads = [threading.Thread(target=caller, args=(out,)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert out == ['entry'] * 5
+    assert len(calls) == 1
+
+
+def test_failed_computation_is_not_cached():
+    cache = ResultCache(maxsize=4)
+
+    def fail():
+        raise RuntimeError('boom')
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('key', fail)
+    assert cache.get_or_compute('key', lambda: 1) == 1
+
+
+def test_select_rows_matches_mask():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({'area_name': pd.Categorical(rng.choice(['A', 'B', 'C'], n)),
+                       'vict_sex': pd.Categorical(rng.choice(['F', 'M', 'X'], n))})
+    index = build_filter_index(df)
+    rows = select_rows(index, filter_key('B', vict_sex=['F']))
+    expected = np.flatnonzero((df['area_name'] == 'B') & (df['vict_sex'] == 'F'))
+    np.testing.assert_array_equal(rows, expected)
+    assert select_rows(index, filter_key(None)) is None
@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from table_query import build_table_index, run_query, parse_filter_query
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({
+        'vict_age': rng.integers(0, 20, n).astype('float64'),
+        'crm': pd.Categorical(rng.choice([f'CRIME {i}' for i in range(30)], n)),
+        'date_time_occ': pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 50, n), unit='D'),
+    })
+    df.loc[rng.random(n) < 0.05, 'vict_age'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('sort_by', [
+    [('vict_age', 'asc'), ('crm', 'desc')],
+    [('vict_age', 'desc'), ('crm', 'asc')],
+    [('date_time_occ', 'desc'), ('vict_age', 'asc')],
+    [('crm', 'asc'), ('date_time_occ', 'asc')],
+])
+def test_multi_sort_matches_sort_values(frame, sort_by):
+    index = build_table_index(frame, list(frame.columns))
+    rows = run_query(index, None, '', [{'column_id': c, 'direction': d} for c, d in sort_by])
+    cols = [c for c, _ in sort_by]
+    expected = frame.astype({'crm': str}).sort_values(cols, ascending=[d == 'asc' for _, d in sort_by],
+                                                      na_position='last', kind='stable')
+    got = frame.astype({'crm': str}).iloc[rows]
+    pd.testing.assert_frame_equal(got[cols].reset_index(drop=True), expected[cols].reset_index(drop=True))
+
+
+@pytest.mark.parametrize('direction', ['asc', 'desc'])
+def test_single_sort_nulls_last_and_stable(frame, direction):
+    index = build_table_index(frame, list(frame.columns))
+    sort_by = [{'column_id': 'vict_age', 'direction': direction}]
+    expected = frame['vict_age'].sort_values(ascending=direction == 'asc', na_position='last', kind='stable')
+    # the whole table takes the presorted order, a small subset is lexsorted
+    np.testing.assert_array_equal(run_query(index, None, '', sort_by), expected.index)
+    subset = np.arange(0, len(frame), 50)
+    np.testing.assert_array_equal(run_query(index, subset, '', sort_by),
+                                  expected.index[np.isin(expected.index, subset)])
+
+
+def test_case_prefixed_operators(frame):
+    index = build_table_index(frame, list(frame.columns))
+    assert len(run_query(index, None, '{vict_age} i> 15', [])) == int((frame['vict_age'] > 15).sum())
+    assert len(run_query(index, None, '{crm} s= "CRIME 1"', [])) == int((frame['crm'] == 'CRIME 1').sum())
+    assert len(run_query(index, None, '{crm} i= "crime 1"', [])) == int((frame['crm'] == 'CRIME 1').sum())
+
+
+def test_no_cache_key_does_not_reuse_results(frame):
+    index = build_table_index(frame, list(frame.columns))
+    assert len(run_query(index, None, '', [])) == len(frame)
+    assert len(run_query(index, np.arange(12), '', [])) == 12
+
+
+def test_unsupported_clause_raises():
+    with pytest.raises(ValueError):
+        parse_filter_query('{vict_age} > 1 || {vict_age} < 3')
+    with pytest.raises(ValueError):
+        parse_filter_query('vict_age > 1')
@@ -0,0 +1,187 @@
+# trend_store.py
+# Rolled-up incident counts for the trend chart.
+#
+# Daily counts per area_name x crm are built once from df_detail (and
+# updated from each ingested delta); weekly and monthly tiers and the
+# per-area totals are derived from them at load. A trend query picks the
+# coarsest tier that still gives enough points for the requested range, so
+# it only touches a few thousand pre-aggregated rows.
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from area_cube import source_signature
+
+ROLLUP_VERSION = 1
+DATE_COL = 'date_time_occ'
+
+# tier -> (pandas period frequency, rolling window in periods, year-over-year shift)
+TIERS = {
+    'D': ('D', 7, pd.Timedelta(days=364)),     # 52 weeks back keeps the weekday
+    'W': ('W-SUN', 4, pd.Timedelta(weeks=52)),  # weeks start on Monday
+    'M': ('M', 3, pd.DateOffset(years=1)),
+}
+# auto tier: daily up to ~6 months, weekly up to ~3 years, monthly beyond
+AUTO_DAILY_DAYS = 190
+AUTO_WEEKLY_DAYS = 1100
+
+
+# =========================
+# Build / update
+# =========================
+def daily_counts(df):
+    """(day, area_name, crm, count) for the incidents of df."""
+    cols = ['day', 'area_name', 'crm', 'count']
+    if df.empty or DATE_COL not in df.columns:
+        return pd.DataFrame(columns=cols)
+    day = pd.to_datetime(df[DATE_COL], errors='coerce').dt.normalize()
+    out = (pd.DataFrame({'day': day, 'area_name': df['area_name'].astype(str),
+                         'crm': df['crm'].astype(str) if 'crm' in df.columns else '-'})
+           .dropna(subset=['day'])
+           .groupby(['day', 'area_name', 'crm'], sort=False).size().reset_index(name='count'))
+    return out[cols]
+
+
+def _finish(daily):
+    daily = daily[daily['count'] > 0]
+    daily = daily.astype({'area_name': 'category', 'crm': 'category', 'count': 'int32'})
+    return daily.sort_values(['area_name', 'day'], kind='stable').reset_index(drop=True)
+
+
+def build_rollup(df):
+    return {'version': ROLLUP_VERSION, 'daily': _finish(daily_counts(df))}
+
+
+def apply_delta(rollup, added, removed=None):
+    """rollup + counts(added) - counts(removed); both are clean incident frames."""
+    parts = [rollup['daily'].astype({'area_name': str, 'crm': str}), daily_counts(added)]
+    if removed is not None and not removed.empty:
+        parts.append(daily_counts(removed).assign(count=lambda d: -d['count']))
+    daily = pd.concat(parts).groupby(['day', 'area_name', 'crm'], sort=False)['count'].sum().reset_index()
+    return {'version': ROLLUP_VERSION, 'daily': _finish(daily)}
+
+
+# =========================
+# Tiers
+# =========================
+def _area_slices(df):
+    """{area: (start, stop)} row ranges of a frame sorted by area_name."""
+    codes = df['area_name'].cat.codes.to_numpy()
+    bounds = np.searchsorted(codes, np.arange(len(df['area_name'].cat.categories) + 1))
+    return {a: (bounds[i], bounds[i + 1]) for i, a in enumerate(df['area_name'].cat.categories)}
+
+
+def build_tiers(rollup):
+    """{tier: {'by_crm', 'total', 'slices_by_crm', 'slices_total'}} from the daily rollup."""
+    daily = rollup['daily']
+    tiers = {}
+    for tier, (freq, _, _) in TIERS.items():
+        period = daily['day'] if tier == 'D' else daily['day'].dt.to_period(freq).dt.start_time
+        by_crm = (daily.assign(period=period)
+                  .groupby(['area_name', 'crm', 'period'], observed=True, sort=False)['count'].sum()
+                  .reset_index().sort_values(['area_name', 'period'], kind='stable').reset_index(drop=True))
+        total = (by_crm.groupby(['area_name', 'period'], observed=True)['count'].sum()
+                 .reset_index().sort_values(['area_name', 'period'], kind='stable').reset_index(drop=True))
+        tiers[tier] = {'by_crm': by_crm, 'total': total,
+                       'slices_by_crm': _area_slices(by_crm), 'slices_total': _area_slices(total)}
+    return tiers
+
+
+def pick_tier(start, end):
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    if days <= AUTO_DAILY_DAYS:
+        return 'D'
+    return 'W' if days <= AUTO_WEEKLY_DAYS else 'M'
+
+
+def query_trend(tiers, tier, area=None, crm=None, start=None, end=None):
+    """Series period -> count for one area (None = all) and crm list (None = all)."""
+    t = tiers[tier]
+    frame, slices = (t['by_crm'], t['slices_by_crm']) if crm else (t['total'], t['slices_total'])
+    if area:
+        lo, hi = slices.get(area, (0, 0))
+        frame = frame.iloc[lo:hi]
+    mask = np.ones(len(frame), dtype=bool)
+    if start is not None:
+        mask &= (frame['period'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (frame['period'] <= pd.Timestamp(end)).to_numpy()
+    if crm:
+        mask &= frame['crm'].isin(list(crm)).to_numpy()
+    sub = frame[mask]
+    out = sub.groupby('period')['count'].sum() if area is None or crm else sub.set_index('period')['count']
+    return out.sort_index().astype('int64')
+
+
+def _period_start(ts, tier):
+    ts = pd.Timestamp(ts).normalize()
+    return ts if tier == 'D' else ts.to_period(TIERS[tier][0]).start_time
+
+
+def trend_with_stats(tiers, tier, area=None, crm=None, start=None, end=None):
+    """Counts, rolling mean and the same periods one year earlier, on one period index."""
+    _, window, yoy = TIERS[tier]
+    # partial first/last periods are included whole
+    start = _period_start(start, tier) if start is not None else None
+    end = _period_start(end, tier) if end is not None else None
+    cur = query_trend(tiers, tier, area, crm, start, end)
+    if cur.empty:
+        return pd.DataFrame(columns=['count', 'rolling', 'prev_year'])
+    lo = start if start is not None else cur.index.min()
+    hi = end if end is not None else cur.index.max()
+    # periods without incidents are zeros, not gaps
+    full = pd.date_range(lo, hi, freq={'D': 'D', 'W': '7D', 'M': 'MS'}[tier])
+    prev = query_trend(tiers, tier, area, crm, lo - yoy, hi - yoy)
+    prev.index = prev.index + yoy
+    out = pd.DataFrame({'count': cur.reindex(full, fill_value=0)})
+    out['rolling'] = out['count'].rolling(window, min_periods=1).mean()
+    # same rule a year back, except before the rollup starts (no data, not zero)
+    prev = prev.reindex(full, fill_value=0).astype('float64')
+    first = tiers[tier]['total']['period'].min()
+    prev[(full - yoy) < first] = np.nan
+    out['prev_year'] = prev
+    return out
+
+
+# =========================
+# Persist
+# =========================
+def save_rollup(rollup, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(rollup, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_rollup(path, signature=None):
+    """Return the persisted rollup, or None if missing/stale."""
+    try:
+        with open(path, 'rb') as f:
+            rollup = pickle.load(f)
+    except Exception:
+        return None
+    if rollup.get('version') != ROLLUP_VERSION:
+        return None
+    if signature is not None and rollup.get('signature') != signature:
+        return None
+    return rollup
+
+
+def load_or_build_rollup(df, path, source_paths=()):
+    signature = source_signature(source_paths)
+    rollup = load_rollup(path, signature) if signature else None
+    if rollup is not None:
+        print(f"✅ Loaded trend rollup {path} ({len(rollup['daily'])} rows)")
+        return rollup
+    rollup = build_rollup(df)
+    rollup['signature'] = signature
+    if signature:
+        try:
+            save_rollup(rollup, path)
+            print(f"✅ Saved trend rollup {path} ({len(rollup['daily'])} rows)")
+        except Exception as e:
+            print(f"❌ Fail save trend rollup {path}: {e}")
+    return rollup